@@ -37,12 +37,121 @@ VERSION = "0.1.6"
 # Python Standard Lib Imports
 import os
 import sys
+import glob
 import argparse
 import logging
+import heapq
+import mmap
+import struct
+import time
+import hashlib
+import functools
+import multiprocessing
+from contextlib import contextmanager
+from array import array
+from collections import deque
+from multiprocessing.sharedctypes import RawArray
+
+# Python 2/3 Compatibility
+try:
+	xrange
+except NameError:
+	xrange = range
+
+# Optional Third Party Imports
+try:
+	import numpy
+except ImportError:
+	numpy = None
+try:
+	import resource
+except ImportError:
+	resource = None
+try:
+	from concurrent.futures import ProcessPoolExecutor, as_completed
+except ImportError:  # Python 2 without the futures backport
+	ProcessPoolExecutor = None
+
+# Circuit eviction policies when a better fitting juggler arrives at a full circuit
+EVICT_WEAKEST = "weakest"  # Displace the weakest fit on the roster (heap backed)
+EVICT_FIRST = "first"  # Displace the first weaker fit found (legacy linear scan)
+EVICTION_POLICIES = (EVICT_WEAKEST, EVICT_FIRST)
+
+# Fit computation backends
+BACKEND_PYTHON = "python"  # Dot product per proposal
+BACKEND_NUMPY = "numpy"  # Every juggler x preference fit precomputed in one pass
+BACKENDS = (BACKEND_PYTHON, BACKEND_NUMPY)
+
+# What happens to jugglers rejected by every circuit they prefer
+FALLBACK_NONE = "none"  # Leave them unassigned
+FALLBACK_BEST_FIT = "best-fit"  # Place them on the open circuit they fit best
+FALLBACK_MODES = (FALLBACK_NONE, FALLBACK_BEST_FIT)
+# Open circuits short-listed per leftover, and fits ranked per block
+FALLBACK_TOP_K = 8
+FALLBACK_BLOCK_CELLS = 1 << 22
+
+# Worker processes used by the parallel engine (1 runs the serial engine)
+DEFAULT_WORKERS = 1
+
+# Generated preference lists: fits ranked per block, and the widest circuit
+# block (blocks of jugglers shrink to keep to the cell count)
+RANK_BLOCK_CELLS = 1 << 22
+RANK_BLOCK_CIRCUITS = 1 << 16
+
+# Juggler x preference fits checked per block by the stability verifier
+VERIFY_BLOCK_CELLS = 1 << 22
+
+# Bytes read per block by the chunked parser
+PARSE_CHUNK_SIZE = 1 << 24
+# Maps every byte except digits to a space, leaving bare integer fields 
+# (unsigned; blocks holding a '-' go to the line parser)
+_DIGITS_ONLY = bytes(bytearray(c if 48 <= c <= 57 else 32 for c in range(256)))
+
+# Bytes buffered by the answer writer
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+# Binary snapshot layout: a header followed by the instance arrays, each 
+# padded to 8 bytes. Numbers and preferences are int32, skills are int64,
+# all little-endian. The source file's size and mtime, and the preference 
+# count its lists were completed to (0 for none), mark it fresh.
+SNAPSHOT_SUFFIX = ".snapshot"
+SNAPSHOT_MAGIC = b"JFSNAP02"
+# Stored results are snapshots with the assignment vector (int32) appended
+RESULT_MAGIC = b"JFRSLT02"
+SNAPSHOT_HEADER = struct.Struct("<8sIIQQdQ")
+# Snapshots are read straight into array.array sections of the same width
+SNAPSHOTS_SUPPORTED = array('i').itemsize == 4 and array('l').itemsize == 8
+
+# Checkpoints of a matching in progress: a header followed by the assignment
+# vector, cursors, free queue and roster lengths (int32) and the roster keys
+# (int64), laid out like snapshot sections
+CHECKPOINT_SUFFIX = ".checkpoint"
+CHECKPOINT_MAGIC = b"JFCKPT01"
+CHECKPOINT_HEADER = struct.Struct("<8sIIQQdQQQQI")
+# Default checkpoint interval: whichever comes first
+CHECKPOINT_PROPOSALS = 1 << 22
+CHECKPOINT_SECONDS = 60.0
+CHECKPOINT_CLOCK_STRIDE = 1 << 12
+
+# Result cache: entry suffix, default size cap and the options that change
+# a result (and so are part of its key)
+CACHE_SUFFIX = ".result"
+DEFAULT_CACHE_DIR = ".jugglefest-cache"
+DEFAULT_CACHE_BYTES = 1 << 30
+CACHE_KEY_OPTIONS = ("eviction", "fallback", "preference_count")
+
+# Roster entries pack (fit, juggler index) into one int; see roster_key()
+ROSTER_SHIFT = 32
+ROSTER_MASK = (1 << ROSTER_SHIFT) - 1
+
+# Suffix of the per-file answers written by batch mode
+BATCH_OUTPUT_SUFFIX = ".answer.txt"
 
 # Attach root logger
 root_logger = logging.getLogger(__name__)
 root_logger.setLevel(logging.DEBUG)
+# Handlers attached to root_logger so far, by (kind, target); see attach_handler()
+_attached_handlers = {}
 
 class JuggleFestException(Exception):
 	''' Base exception for JuggleFest Module '''
@@ -59,32 +168,831 @@ class FileParseFailure(JuggleFestException):
 	pass
 
 
+class FileWriteFailure(JuggleFestException):
+	''' Failed to write the output file '''
+	pass
+
+
+class BackendUnavailable(JuggleFestException):
+	''' The requested backend's dependencies are not installed '''
+	pass
+
+
+class EntityNotFound(JuggleFestException):
+	''' No circuit or juggler has the requested number '''
+	pass
+
+
+class JuggleFestInstance(object):
+
+	''' Struct-of-arrays storage for circuits, jugglers and their matching
+
+	Circuits and jugglers are addressed by index (order of appearance in the
+	inputfile). Skills are stored flattened as [h0, e0, p0, h1, ...] and
+	preferences as a row-major (jugglers x width) matrix of circuit indexes
+	padded with -1. The matching itself is an assignment vector (circuit 
+	index per juggler, -1 while free), a next-preference cursor per juggler
+	and one roster of encoded keys (see roster_key) per circuit.
+
+	Removed jugglers keep their index (so roster keys stay valid) but have
+	their preference row blanked and are listed in removed.
+
+	A copy() shares its rosters and listings with the original until one
+	side writes to them; every write to a roster goes through admit(),
+	withdraw() or seat() so that it can be unshared first.
+	'''
+
+	def __init__(self):
+		self.circuit_nums = array('i')
+		self.circuit_skills = array('l')
+		self.juggler_nums = array('i')
+		self.juggler_skills = array('l')
+		self.preferences = array('i')
+		self.width = 0
+		self.max_jugglers = 0
+		self.assignment = array('i')
+		self.cursors = array('i')
+		self.rosters = []
+		self.removed = set()
+		# Circuit -> jugglers listing it; built on demand by listed_by()
+		self.listings = None
+		# Circuits whose roster and listing this instance owns, while it
+		# shares the others with a copy; None when it owns them all
+		self._owned = None
+		# Juggler -> circuit before its first assignment change, while 
+		# changes are being tracked; None otherwise
+		self.moves = None
+
+	@property
+	def num_circuits(self):
+		return len(self.circuit_nums)
+
+	@property
+	def num_jugglers(self):
+		return len(self.juggler_nums)
+
+	def add_circuit(self, number, h, e, p):
+		''' Append a circuit and return its index '''
+		self.circuit_nums.append(number)
+		self.circuit_skills.extend((h, e, p))
+		self.rosters.append([])
+		if self.listings is not None:
+			self.listings.append(array('i'))
+		return len(self.circuit_nums) - 1
+
+	def add_juggler(self, number, h, e, p, preferences):
+		''' Append a juggler with a list of preferred circuit indexes and 
+				return its index '''
+		if len(preferences) > self.width:
+			self._widen(len(preferences))
+		self.juggler_nums.append(number)
+		self.juggler_skills.extend((h, e, p))
+		self.preferences.extend(preferences)
+		self.preferences.extend([-1] * (self.width - len(preferences)))
+		self.assignment.append(-1)
+		self.cursors.append(0)
+		index = len(self.juggler_nums) - 1
+		if self.listings is not None:
+			for circuit in preferences:
+				if self._owned is not None:
+					self._own(circuit)
+				self.listings[circuit].append(index)
+		return index
+
+	def remove_juggler(self, juggler):
+		''' Take a juggler out of the matching for good. The caller is 
+				responsible for its circuit's roster. '''
+		row = juggler * self.width
+		self.preferences[row:row + self.width] = array('i', [-1]) * self.width
+		self.assign(juggler, -1)
+		self.cursors[juggler] = self.width
+		self.removed.add(juggler)
+
+	def listed_by(self, circuit):
+		''' Indexes of the jugglers with a circuit on their preference list.
+				The index is built on first use and kept up to date by 
+				add_juggler; removed jugglers are not filtered out. '''
+		if self.listings is None:
+			width = self.width
+			if numpy is not None and len(self.preferences):
+				preferences = as_numpy(self.preferences)
+				positions = numpy.flatnonzero(preferences >= 0)
+				circuits = preferences[positions]
+				# Sorting (circuit, position) keys keeps each circuit's 
+				# jugglers in index order
+				keys = circuits.astype(numpy.int64) * len(preferences) + positions
+				keys.sort()
+				jugglers = (keys % len(preferences) // width).astype('i')
+				bounds = numpy.cumsum(numpy.bincount(circuits, 
+					minlength=self.num_circuits)).tolist()
+				# array('i', bytes) reads the raw values
+				raw, size = jugglers.tobytes(), jugglers.itemsize
+				listings = [array('i', raw[start * size:stop * size]) 
+					for start, stop in zip([0] + bounds[:-1], bounds)]
+			else:
+				listings = [array('i') for _ in xrange(self.num_circuits)]
+				for position, preference in enumerate(self.preferences):
+					if preference >= 0:
+						listings[preference].append(position // width)
+			self.listings = listings
+		return self.listings[circuit]
+
+	def preference_position(self, juggler, circuit):
+		''' Position of a circuit on a juggler's preference list, or -1 '''
+		row = juggler * self.width
+		for k in xrange(self.width):
+			if self.preferences[row + k] == circuit:
+				return k
+		return -1
+
+	def extend_circuits(self, nums, skills):
+		''' Bulk append circuits from flat number and (h, e, p) skill 
+				sequences (array.array or numpy arrays) '''
+		self.circuit_nums.extend(as_array('i', nums))
+		self.circuit_skills.extend(as_array('l', skills))
+		self.rosters.extend([[] for _ in xrange(len(nums))])
+
+	def extend_jugglers(self, nums, skills, preferences):
+		''' Bulk append jugglers from flat number, (h, e, p) skill and 
+				preference sequences. Preference rows must already be padded
+				to the instance width. '''
+		self.juggler_nums.extend(as_array('i', nums))
+		self.juggler_skills.extend(as_array('l', skills))
+		self.preferences.extend(as_array('i', preferences))
+		self.assignment.extend(array('i', [-1]) * len(nums))
+		self.cursors.extend(array('i', [0]) * len(nums))
+
+	def write_snapshot(self, path, source_size=0, source_mtime=0.0, 
+			assignment=False, preference_count=0):
+		''' Write the circuits, jugglers and preferences (and with assignment,
+				the assignment vector) to a binary snapshot. preference_count
+				is the count generated preference lists were completed to. 
+				The file is written to a temporary name and renamed into 
+				place. '''
+		sections = (self.circuit_nums, self.circuit_skills, self.juggler_nums,
+			self.juggler_skills, self.preferences)
+		if assignment:
+			sections += (self.assignment,)
+		temp_path = "%s.%d.tmp" % (path, os.getpid())
+		with open(temp_path, "wb") as f:
+			f.write(SNAPSHOT_HEADER.pack(
+				RESULT_MAGIC if assignment else SNAPSHOT_MAGIC, self.num_circuits, 
+				self.width, self.num_jugglers, source_size, source_mtime, 
+				preference_count))
+			write_sections(f, sections)
+		getattr(os, "replace", os.rename)(temp_path, path)
+
+	@classmethod
+	def read_snapshot(cls, path):
+		''' Load an instance from a binary snapshot by memory-mapping it and
+				copying each array section in one piece. Returns the instance and
+				the (size, mtime, preference count) of the source file it was 
+				taken from. A stored result also restores the assignment 
+				vector; see rebuild_rosters(). '''
+		instance = cls()
+		instance.assignment = array('i')
+		with open(path, "rb") as f:
+			mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+			try:
+				(magic, circuits, width, jugglers, source_size, source_mtime, 
+					preference_count) = SNAPSHOT_HEADER.unpack_from(mapped, 0)
+				if magic not in (SNAPSHOT_MAGIC, RESULT_MAGIC):
+					raise ValueError("Not a JuggleFest snapshot: %s" % path)
+				sections = [(instance.circuit_nums, circuits), 
+					(instance.circuit_skills, circuits * 3), 
+					(instance.juggler_nums, jugglers),
+					(instance.juggler_skills, jugglers * 3), 
+					(instance.preferences, jugglers * width)]
+				if magic == RESULT_MAGIC:
+					sections.append((instance.assignment, jugglers))
+				read_sections(mapped, SNAPSHOT_HEADER.size, sections, path)
+			finally:
+				mapped.close()
+		instance.width = width
+		instance.rosters = [[] for _ in xrange(circuits)]
+		if not len(instance.assignment):
+			instance.assignment = array('i', [-1]) * jugglers
+		instance.cursors = array('i', [0]) * jugglers
+		return instance, (source_size, source_mtime, preference_count)
+
+	def write_checkpoint(self, path, free, source_size=0, source_mtime=0.0,
+			proposals=0, rounds=0, eviction=EVICT_WEAKEST):
+		''' Write the state of a matching in progress (assignment vector, 
+				cursors, the free queue and the rosters, in order) to a 
+				checkpoint. The file is synced under a temporary name and 
+				renamed into place, so a crash leaves the previous one. '''
+		free = array('i', free)
+		lengths = array('i', [len(roster) for roster in self.rosters])
+		keys = array('l')
+		for roster in self.rosters:
+			keys.extend(roster)
+		temp_path = "%s.%d.tmp" % (path, os.getpid())
+		with open(temp_path, "wb") as f:
+			f.write(CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, self.num_circuits,
+				self.width, self.num_jugglers, source_size, source_mtime, 
+				len(free), len(keys), proposals, rounds, 
+				EVICTION_POLICIES.index(eviction)))
+			write_sections(f, (self.assignment, self.cursors, free, lengths, 
+				keys))
+			f.flush()
+			os.fsync(f.fileno())
+		getattr(os, "replace", os.rename)(temp_path, path)
+
+	def read_checkpoint(self, path, source_size=0, source_mtime=0.0,
+			eviction=EVICT_WEAKEST):
+		''' Restore a matching in progress from a checkpoint written for 
+				this instance. Returns (free queue, proposals, rounds); raises
+				ValueError if the checkpoint belongs to another instance or
+				eviction policy. '''
+		assignment, cursors, free = array('i'), array('i'), array('i')
+		lengths, keys = array('i'), array('l')
+		with open(path, "rb") as f:
+			mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+			try:
+				(magic, circuits, width, jugglers, size, mtime, free_count, 
+					key_count, proposals, rounds, policy) = (
+					CHECKPOINT_HEADER.unpack_from(mapped, 0))
+				if magic != CHECKPOINT_MAGIC:
+					raise ValueError("Not a JuggleFest checkpoint: %s" % path)
+				if ((circuits, width, jugglers, size, mtime) != 
+						(self.num_circuits, self.width, self.num_jugglers, 
+						source_size, source_mtime)):
+					raise ValueError("Checkpoint %s is for another inputfile" 
+						% path)
+				if policy != EVICTION_POLICIES.index(eviction):
+					raise ValueError("Checkpoint %s is for another eviction "
+						"policy" % path)
+				read_sections(mapped, CHECKPOINT_HEADER.size, [
+					(assignment, jugglers), (cursors, jugglers), 
+					(free, free_count), (lengths, circuits), (keys, key_count)],
+					path)
+			finally:
+				mapped.close()
+		rosters, start = [], 0
+		for length in lengths:
+			rosters.append(keys[start:start + length].tolist())
+			start += length
+		self.assignment, self.cursors, self.rosters = (
+			assignment, cursors, rosters)
+		return free.tolist(), proposals, rounds
+
+	def _widen(self, width):
+		''' [Private] Re-pad the preference matrix to a larger width '''
+		old, pad = self.width, [-1] * (width - self.width)
+		widened = array('i')
+		for row in xrange(self.num_jugglers):
+			widened.extend(self.preferences[row * old:(row + 1) * old])
+			widened.extend(pad)
+		self.preferences = widened
+		self.width = width
+
+	def fit(self, juggler, circuit):
+		''' Dot product between a juggler and a circuit, by index '''
+		js, cs = self.juggler_skills, self.circuit_skills
+		j, c = juggler * 3, circuit * 3
+		return js[j] * cs[c] + js[j + 1] * cs[c + 1] + js[j + 2] * cs[c + 2]
+
+	def juggler_preferences(self, juggler):
+		''' Preferred circuit indexes of a juggler, best first '''
+		row = self.preferences[juggler * self.width:(juggler + 1) * self.width]
+		return [c for c in row if c >= 0]
+
+	def circuit_index(self, number):
+		''' Index of the circuit with the given number. Circuits are normally
+				numbered by position, so this is O(1) for well formed input. '''
+		nums = self.circuit_nums
+		if 0 <= number < len(nums) and nums[number] == number:
+			return number
+		try:
+			return nums.index(number)
+		except ValueError:
+			raise EntityNotFound("No circuit C%d" % number)
+
+	def juggler_index(self, number):
+		''' Index of the (not removed) juggler with the given number '''
+		nums = self.juggler_nums
+		if (0 <= number < len(nums) and nums[number] == number and
+				number not in self.removed):
+			return number
+		for index in xrange(len(nums) - 1, -1, -1):
+			if nums[index] == number and index not in self.removed:
+				return index
+		raise EntityNotFound("No juggler J%d" % number)
+
+	def juggler_sum(self, circuit):
+		''' Sum of the juggler numbers on a circuit's roster '''
+		nums = self.juggler_nums
+		return sum([nums[roster_juggler(key)] for key in self.rosters[circuit]])
+
+	def juggler_sums(self):
+		''' Sum of the assigned juggler numbers for every circuit, computed 
+				from the assignment vector in one pass '''
+		if numpy is not None and self.num_jugglers:
+			assignment = as_numpy(self.assignment)
+			assigned = assignment >= 0
+			return numpy.bincount(assignment[assigned], 
+				weights=as_numpy(self.juggler_nums)[assigned],
+				minlength=self.num_circuits).astype(numpy.int64)
+		sums = [0] * self.num_circuits
+		for juggler, circuit in enumerate(self.assignment):
+			if circuit >= 0:
+				sums[circuit] += self.juggler_nums[juggler]
+		return sums
+
+	def copy(self):
+		''' Copy of the instance and its matching, e.g. to try changes on. 
+				The arrays are copied outright; rosters and listings (see
+				listed_by) are shared until written, so a copy costs one 
+				memcpy per array rather than a pass over every roster. '''
+		if self.num_circuits:
+			# Built once here, so that copies share it rather than each
+			# building its own
+			self.listed_by(0)
+		clone = JuggleFestInstance()
+		for name in ("circuit_nums", "circuit_skills", "juggler_nums", 
+				"juggler_skills", "preferences", "assignment", "cursors"):
+			setattr(clone, name, getattr(self, name)[:])
+		clone.width = self.width
+		clone.max_jugglers = self.max_jugglers
+		clone.rosters = list(self.rosters)
+		clone.removed = set(self.removed)
+		clone.listings = None if self.listings is None else list(self.listings)
+		# Neither side may now write to a roster or listing in place
+		self._owned = set()
+		clone._owned = set()
+		return clone
+
+	def _own(self, circuit):
+		''' [Private] Unshare a circuit's roster and listing before writing
+				to them '''
+		if circuit not in self._owned:
+			self.rosters[circuit] = list(self.rosters[circuit])
+			if self.listings is not None:
+				self.listings[circuit] = array('i', self.listings[circuit])
+			self._owned.add(circuit)
+
+	def assign(self, juggler, circuit):
+		''' Set a juggler's circuit (-1 for none) in the assignment vector,
+				recording where it was first if moves are tracked '''
+		if self.moves is not None and juggler not in self.moves:
+			self.moves[juggler] = self.assignment[juggler]
+		self.assignment[juggler] = circuit
+
+	def moved(self, jugglers=None):
+		''' Number of the tracked jugglers (below index jugglers, if given)
+				whose circuit differs from where they were first '''
+		assignment = self.assignment
+		return sum([1 for juggler, circuit in self.moves.items() 
+			if (jugglers is None or juggler < jugglers) and 
+			assignment[juggler] != circuit])
+
+	def seat(self, circuit, juggler, fit):
+		''' Put a juggler on a circuit with a free seat and assign it 
+				there '''
+		if self._owned is not None:
+			self._own(circuit)
+		heapq.heappush(self.rosters[circuit], roster_key(fit, juggler))
+		self.assign(juggler, circuit)
+
+	def admit(self, circuit, juggler, fit, eviction=EVICT_WEAKEST):
+		''' Try to place a juggler on a circuit's roster. Returns a tuple of 
+				(admitted, displaced juggler index or None). Does not touch
+				the assignment vector. '''
+		if self._owned is not None:
+			self._own(circuit)
+		roster = self.rosters[circuit]
+		key = roster_key(fit, juggler)
+		# If there is room, add as participant
+		if len(roster) < self.max_jugglers:
+			if eviction == EVICT_WEAKEST:
+				heapq.heappush(roster, key)
+			else:
+				roster.append(key)
+			return True, None
+		if eviction == EVICT_WEAKEST:
+			# Only the weakest member can be displaced; check is O(1)
+			if roster and roster[0] < key:
+				return True, roster_juggler(heapq.heapreplace(roster, key))
+		else:
+			# If no room, see if better fit than any current participant
+			for idx, participant in enumerate(roster):
+				# If current participant is a weaker match to this
+				# circuit, reassign
+				if roster_fit(participant) < fit:
+					roster[idx] = key
+					return True, roster_juggler(participant)
+		return False, None
+
+	def withdraw(self, circuit, juggler, fit):
+		''' Remove a juggler from a circuit's roster, keeping heap order '''
+		if self._owned is not None:
+			self._own(circuit)
+		roster = self.rosters[circuit]
+		roster.remove(roster_key(fit, juggler))
+		heapq.heapify(roster)
+
+	def rebuild_rosters(self):
+		''' Rebuild the rosters and cursors of a matching from the assignment
+				vector, e.g. after loading a stored result. Cursors resume
+				after each juggler's circuit; unassigned jugglers (and ones
+				placed off their list by the fallback phase) are exhausted. '''
+		width = self.width
+		if numpy is not None and self.num_jugglers and width:
+			assignment = as_numpy(self.assignment)
+			preferences = as_numpy(self.preferences).reshape(-1, width)
+			current = preferences == assignment[:, None]
+			listed = current.any(axis=1)
+			cursors = numpy.where(listed & (assignment >= 0), 
+				current.argmax(axis=1) + 1, width)
+			self.cursors = as_array('i', cursors)
+			jugglers = numpy.flatnonzero(assignment >= 0)
+			circuits = assignment[jugglers]
+			fits = (as_numpy(self.juggler_skills).reshape(-1, 3)[jugglers] * 
+				as_numpy(self.circuit_skills).reshape(-1, 3)[circuits]).sum(
+				axis=1)
+			if not fits.size or (fits.min() >= 0 and 
+					fits.max() < 1 << (63 - ROSTER_SHIFT)):
+				keys = (fits << ROSTER_SHIFT) + (ROSTER_MASK - jugglers)
+				# Ascending keys per circuit already form a min-heap
+				order = numpy.lexsort((keys, circuits))
+				bounds = numpy.cumsum(numpy.bincount(circuits, 
+					minlength=self.num_circuits)).tolist()
+				keys = keys[order].tolist()
+				self.rosters = [keys[start:stop] for start, stop in 
+					zip([0] + bounds[:-1], bounds)]
+				return
+		self.rosters = [[] for _ in xrange(self.num_circuits)]
+		for juggler, circuit in enumerate(self.assignment):
+			if circuit < 0:
+				self.cursors[juggler] = width
+				continue
+			self.rosters[circuit].append(
+				roster_key(self.fit(juggler, circuit), juggler))
+			position = self.preference_position(juggler, circuit)
+			self.cursors[juggler] = position + 1 if position >= 0 else width
+		for roster in self.rosters:
+			heapq.heapify(roster)
+
+	def memory_footprint(self):
+		''' Approximate bytes held by the instance arrays and rosters '''
+		total = 0
+		for arr in (self.circuit_nums, self.circuit_skills, self.juggler_nums,
+				self.juggler_skills, self.preferences, self.assignment, 
+				self.cursors):
+			total += sys.getsizeof(arr)
+		total += sys.getsizeof(self.rosters)
+		for roster in self.rosters:
+			total += sys.getsizeof(roster) + sum(
+				[sys.getsizeof(key) for key in roster])
+		return total
+
+
+def as_numpy(values):
+	''' Zero-copy numpy view of an array.array '''
+	if not len(values):
+		return numpy.zeros(0, dtype=values.typecode)
+	return numpy.frombuffer(values, dtype=values.typecode)
+
+
+def as_array(typecode, values):
+	''' Convert a flat numpy array or other sequence to an array.array '''
+	if isinstance(values, array) and values.typecode == typecode:
+		return values
+	if numpy is not None and isinstance(values, numpy.ndarray):
+		converted = array(typecode)
+		raw = numpy.ascontiguousarray(values, dtype=typecode).tobytes()
+		if hasattr(converted, 'frombytes'):
+			converted.frombytes(raw)
+		else:
+			converted.fromstring(raw)
+		return converted
+	return array(typecode, values)
+
+
+def read_buffer(values, buf, offset, size):
+	''' Append size bytes of buf, starting at offset, to an array.array '''
+	if hasattr(values, 'frombytes'):
+		view = memoryview(buf)
+		try:
+			values.frombytes(view[offset:offset + size])
+		finally:
+			view.release()
+	else:
+		values.fromstring(buf[offset:offset + size])
+
+
+def write_sections(f, sections):
+	''' Write array.array sections little-endian, each padded to 8 bytes '''
+	for section in sections:
+		if sys.byteorder != "little":
+			section = array(section.typecode, section)
+			section.byteswap()
+		section.tofile(f)
+		f.write(b"\0" * (-len(section) * section.itemsize % 8))
+
+
+def read_sections(mapped, offset, sections, path):
+	''' Append (array.array, item count) sections written by 
+			write_sections() at offset of a mapped file; returns the offset
+			after them '''
+	for section, count in sections:
+		size = count * section.itemsize
+		if offset + size > len(mapped):
+			raise ValueError("Truncated JuggleFest file: %s" % path)
+		read_buffer(section, mapped, offset, size)
+		if sys.byteorder != "little":
+			section.byteswap()
+		offset += size + (-size % 8)
+	return offset
+
+
+def snapshot_path(input_file):
+	''' Where the binary snapshot of an inputfile lives '''
+	return input_file + SNAPSHOT_SUFFIX
+
+
+def checkpoint_path(input_file):
+	''' Where checkpoints of a matching of an inputfile are written '''
+	return input_file + CHECKPOINT_SUFFIX
+
+
+def parse_integers(text):
+	''' Parse every run of digits in a bytes block into a flat integer 
+			array without building a string per field '''
+	text = text.translate(_DIGITS_ONLY)
+	if numpy is not None:
+		if not text.strip():
+			return numpy.zeros(0, dtype=numpy.int64)
+		return numpy.fromstring(text, dtype=numpy.int64, sep=' ')
+	return array('l', map(int, text.split()))
+
+
+def record_columns(values, stride, start, stop=None):
+	''' Flat copy of columns [start, stop) of a row-major integer block with
+			the given row stride '''
+	stop = start + 1 if stop is None else stop
+	if numpy is not None and isinstance(values, numpy.ndarray):
+		return values.reshape(-1, stride)[:, start:stop].ravel()
+	if stop - start == 1:
+		return values[start::stride]
+	columns = array(values.typecode)
+	for row in xrange(0, len(values), stride):
+		columns.extend(values[row + start:row + stop])
+	return columns
+
+
+def count_records(block, tag):
+	''' Count lines of a bytes block whose first field is the tag byte '''
+	return sum([block.count(b'\n' + tag + space) + 
+		(1 if block[:2] == tag + space else 0) for space in (b' ', b'\t')])
+
+
+def count_fields(block):
+	''' Number of whitespace-separated fields in a bytes block, as 
+			split() would find them '''
+	if numpy is None:
+		return len(block.split())
+	text = numpy.frombuffer(block, dtype=numpy.uint8)
+	if not len(text):
+		return 0
+	# Space, or \t \n \v \f \r (9 through 13)
+	space = (text == 32) | (text - numpy.uint8(9) < 5)
+	# A field starts wherever a non-space byte follows a space (or the start)
+	return int(not space[0]) + int(numpy.count_nonzero(space[:-1] & ~space[1:]))
+
+
+def roster_key(fit, juggler):
+	''' Encode a roster entry as one int that orders by fit, then by juggler 
+			index descending, so a min-heap keeps the weakest member (lowest 
+			fit, ties going to the later juggler) at the front '''
+	return (fit << ROSTER_SHIFT) + (ROSTER_MASK - juggler)
+
+
+def roster_fit(key):
+	''' Fit stored in an encoded roster entry '''
+	return key >> ROSTER_SHIFT
+
+
+def roster_juggler(key):
+	''' Juggler index stored in an encoded roster entry '''
+	return ROSTER_MASK - (key & ROSTER_MASK)
+
+
+def attach_handler(key, make):
+	''' Add the handler built by make() to root_logger unless one with the 
+			same (kind, target) key is already attached, so constructing 
+			many schedulers in one process does not pile up handlers '''
+	handler = _attached_handlers.get(key)
+	if handler is None:
+		handler = _attached_handlers[key] = make()
+		root_logger.addHandler(handler)
+	return handler
+
+
+def init_logging(verbose=False, logging_file=None):
+	''' Attach the file, console or errors-only handlers a run asks for, 
+			each at most once per process. Without a file or console logger
+			debug records would be built only to be dropped, so the logger
+			level lets hot paths skip them. '''
+	root_logger.setLevel(logging.DEBUG if verbose or logging_file is not None
+		else logging.WARNING)
+	if logging_file is not None:
+		# Attach File Logger
+		def make_file_handler():
+			file_handler = logging.FileHandler(logging_file)
+			file_handler.setFormatter(logging.Formatter(
+				"%(asctime)s:%(levelname)s:%(module)s.%(funcName)s@L"
+				"%(lineno)d:%(message)s"))
+			return file_handler
+		attach_handler(("file", os.path.abspath(logging_file)), 
+			make_file_handler)
+	if verbose:
+		# Attach Console Logger
+		def make_console_handler():
+			console_handler = logging.StreamHandler(stream=sys.stdout)
+			console_handler.setFormatter(logging.Formatter(
+				"%(levelname)s:%(module)s.%(funcName)s@L%(lineno)d:%(message)s"))
+			console_handler.setLevel(logging.DEBUG)
+			return console_handler
+		attach_handler(("console", None), make_console_handler)
+	else:
+		# Use a base logger
+		def make_error_handler():
+			error_handler = logging.StreamHandler()
+			error_handler.setFormatter(
+				logging.Formatter("%(levelname)s:%(message)s"))
+			error_handler.setLevel(logging.ERROR)
+			return error_handler
+		attach_handler(("errors", None), make_error_handler)
+
+
+def peak_rss_kb():
+	''' Peak resident set size of this process in KiB, if known '''
+	try:
+		with open("/proc/self/status") as f:
+			for line in f:
+				if line.startswith("VmHWM:"):
+					return int(line.split()[1])
+	except IOError:
+		pass
+	if resource is None:
+		return None
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# macOS reports bytes, Linux KiB
+	return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def share_array(values):
+	''' Copy an array.array into shared memory that worker processes can
+			map without pickling it '''
+	shared = RawArray(values.typecode, len(values))
+	if len(values):
+		numpy.frombuffer(shared, dtype=values.typecode)[:len(values)] = \
+			as_numpy(values)
+	return shared
+
+
+def resolve_proposals(connection, circuit_skills, juggler_skills, max_jugglers):
+	''' Worker process loop of the parallel engine. Each message is a round
+			of (juggler indexes, circuit indexes) proposals for the circuits
+			this worker owns; the reply is the jugglers freed by the round 
+			(rejected proposers and displaced members) and how many of them
+			were displaced. A None message ends the loop and the worker 
+			replies with its rosters. 
+
+	Skills are read from shared memory. Rosters are heaps of roster_key()
+	entries, exactly as JuggleFestInstance.admit() keeps them, so each round
+	leaves every circuit with the best max_jugglers of its members and 
+	proposers whatever order they arrive in.
+	'''
+	circuit_skills = numpy.frombuffer(circuit_skills, 
+		dtype=circuit_skills._type_).reshape(-1, 3)
+	juggler_skills = numpy.frombuffer(juggler_skills, 
+		dtype=juggler_skills._type_).reshape(-1, 3)
+	rosters = {}
+	while True:
+		message = connection.recv()
+		if message is None:
+			connection.send(rosters)
+			break
+		jugglers, circuits = message
+		fits = (juggler_skills[jugglers].astype(numpy.int64) * 
+			circuit_skills[circuits]).sum(axis=1)
+		freed = []
+		displaced = 0
+		for j, c, fit in zip(jugglers.tolist(), circuits.tolist(), 
+				fits.tolist()):
+			roster = rosters.get(c)
+			if roster is None:
+				roster = rosters[c] = []
+			key = roster_key(fit, j)
+			if len(roster) < max_jugglers:
+				heapq.heappush(roster, key)
+			elif roster and roster[0] < key:
+				freed.append(roster_juggler(heapq.heapreplace(roster, key)))
+				displaced += 1
+			else:
+				freed.append(j)
+		connection.send((numpy.array(freed, dtype=numpy.int32), displaced))
+
+
+class EntityViews(object):
+
+	''' A lazy, read-only sequence of entity views over an instance '''
+
+	__slots__ = ('instance', 'view')
+
+	def __init__(self, instance, view):
+		self.instance = instance
+		self.view = view
+
+	def __len__(self):
+		return self.view.count(self.instance)
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return [self.view(self.instance, i) for i in 
+				xrange(*index.indices(len(self)))]
+		if index < 0:
+			index += len(self)
+		if not 0 <= index < len(self):
+			raise IndexError(index)
+		return self.view(self.instance, index)
+
+	def __iter__(self):
+		for index in xrange(len(self)):
+			yield self.view(self.instance, index)
+
+
 class JuggleFestEntityBase(object):
 
-	''' A base class for abstract entities in the juggle fest '''
+	''' A base class for abstract entities in the juggle fest. Entities are 
+			thin views over a JuggleFestInstance. '''
 
-	def __init__(self, number, h, e, p):
+	__slots__ = ('instance', 'index')
+
+	def __init__(self, instance, index):
 		''' Initialize base varaibles common across entities '''
-		self.num = number
-		self.h = h
-		self.e = e
-		self.p = p
+		self.instance = instance
+		self.index = index
+
+	def _skills(self):
+		''' [Private] The instance's flattened skill array for this entity '''
+		raise NotImplementedError
+
+	@property
+	def h(self):
+		return self._skills()[self.index * 3]
+
+	@property
+	def e(self):
+		return self._skills()[self.index * 3 + 1]
+
+	@property
+	def p(self):
+		return self._skills()[self.index * 3 + 2]
 
 	def dot_product(self, remote):
 		''' Calculate the dot product between two entities '''
 		return (self.h * remote.h) + (self.e * remote.e) + (self.p * remote.p)
 
+	def __eq__(self, other):
+		return (type(self) is type(other) and self.instance is other.instance
+			and self.index == other.index)
+
+	def __ne__(self, other):
+		return not self == other
+
+	def __hash__(self):
+		return hash((type(self), id(self.instance), self.index))
+
 
 class Circuit(JuggleFestEntityBase):
 
 	''' A juggling circuit class '''
 
-	def __init__(self, number, h, e, p, max_jugglers=0):
-		JuggleFestEntityBase.__init__(self, number, h, e, p)
-		# Default to empty until we can reference the circuit objects
-		self.jugglers = []
-		# Prevent adding participants until we know how many we can take
-		self.max_jugglers = max_jugglers
+	__slots__ = ()
+
+	@staticmethod
+	def count(instance):
+		return instance.num_circuits
+
+	def _skills(self):
+		return self.instance.circuit_skills
+
+	@property
+	def num(self):
+		return self.instance.circuit_nums[self.index]
+
+	@property
+	def max_jugglers(self):
+		return self.instance.max_jugglers
+
+	@property
+	def jugglers(self):
+		''' The roster as (juggler, fit) tuples '''
+		return [(Juggler(self.instance, roster_juggler(key)), roster_fit(key))
+			for key in self.instance.rosters[self.index]]
 
 	def __repr__(self):
 		return "<Circuit #%d: H:%d, E:%d, P:%d, Max:%d, Jugglers[%d]: %s>" % (
@@ -93,95 +1001,285 @@ class Circuit(JuggleFestEntityBase):
 			self.e,
 			self.p,
 			self.max_jugglers,
-			len(self.jugglers),
-			', '.join(['J' + str(j[0].num) for j in self.jugglers]))
+			len(self.instance.rosters[self.index]),
+			', '.join(['J' + str(self.instance.juggler_nums[roster_juggler(key)])
+				for key in self.instance.rosters[self.index]]))
 
 
 class Juggler(JuggleFestEntityBase):
 
 	''' A juggler class '''
 
-	def __init__(self, number, h, e, p, preferences):
-		JuggleFestEntityBase.__init__(self, number, h, e, p)
-		self.preferences = preferences
+	__slots__ = ()
+
+	@staticmethod
+	def count(instance):
+		return instance.num_jugglers
+
+	def _skills(self):
+		return self.instance.juggler_skills
+
+	@property
+	def num(self):
+		return self.instance.juggler_nums[self.index]
+
+	@property
+	def preferences(self):
+		return [Circuit(self.instance, c) for c in 
+			self.instance.juggler_preferences(self.index)]
+
+	@property
+	def next_preference(self):
+		''' Index of the next preference to propose to '''
+		return self.instance.cursors[self.index]
+
+	@property
+	def circuit(self):
+		''' Circuit this juggler is currently on (None while free) '''
+		circuit = self.instance.assignment[self.index]
+		return None if circuit < 0 else Circuit(self.instance, circuit)
 
 	def __repr__(self):
+		preferences = self.instance.juggler_preferences(self.index)
 		return "<Juggler #%d: H:%d, E:%d, P:%d, Prefs[%d]: %s>" % (
 			self.num,
 			self.h,
 			self.e,
 			self.p,
-			len(self.preferences),
-			', '.join(['C' + str(pref.num) for pref in self.preferences]))
+			len(preferences),
+			', '.join(['C' + str(self.instance.circuit_nums[pref]) 
+				for pref in preferences]))
+
+
+class ResultCache(object):
+
+	''' On-disk cache of solved matchings, keyed by a hash of the inputfile
+			bytes and the options that change the result. Entries are
+			stored results (see JuggleFestInstance.write_snapshot), so a hit
+			skips parsing and matching. The least recently used entries are
+			deleted once the cache grows past max_bytes. '''
+
+	def __init__(self, directory=DEFAULT_CACHE_DIR, 
+			max_bytes=DEFAULT_CACHE_BYTES):
+		self.directory = directory
+		self.max_bytes = max_bytes
+
+	def key(self, input_file, options):
+		''' Hex digest of the inputfile's bytes and the result options '''
+		digest = hashlib.sha256(("JuggleFest result 1 %s\n" % ' '.join(
+			["%s=%s" % (name, options[name]) for name in sorted(options)])
+			).encode("utf-8"))
+		with open(input_file, "rb") as f:
+			while True:
+				chunk = f.read(PARSE_CHUNK_SIZE)
+				if not chunk:
+					break
+				digest.update(chunk)
+		return digest.hexdigest()
+
+	def path(self, key):
+		return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+	def load(self, key):
+		''' The instance (with its assignment) stored under key, or None '''
+		path = self.path(key)
+		if not SNAPSHOTS_SUPPORTED or not os.path.exists(path):
+			return None
+		try:
+			instance, _ = JuggleFestInstance.read_snapshot(path)
+			# Mark the entry as recently used
+			os.utime(path, None)
+		except (IOError, OSError, ValueError, struct.error) as e:
+			root_logger.warning("Ignoring unreadable cache entry: %s" % e)
+			return None
+		return instance
+
+	def store(self, key, instance):
+		''' Store a solved instance under key, then trim the cache '''
+		if not SNAPSHOTS_SUPPORTED:
+			return False
+		if not os.path.isdir(self.directory):
+			try:
+				os.makedirs(self.directory)
+			except OSError:
+				# Another process may have made it first
+				if not os.path.isdir(self.directory):
+					raise
+		instance.write_snapshot(self.path(key), assignment=True)
+		self.evict(keep=key)
+		return True
+
+	def evict(self, keep=None):
+		''' Delete the least recently used entries (but not keep) until the
+				cache fits in max_bytes. Returns the number deleted. '''
+		entries = []
+		for name in os.listdir(self.directory):
+			if name.endswith(CACHE_SUFFIX):
+				path = os.path.join(self.directory, name)
+				try:
+					stat = os.stat(path)
+				except OSError:  # Evicted by another process
+					continue
+				entries.append((stat.st_mtime, stat.st_size, path))
+		entries.sort()
+		total = sum([size for _, size, _ in entries])
+		evicted = 0
+		for _, size, path in entries:
+			if total <= self.max_bytes:
+				break
+			if keep is not None and path == self.path(keep):
+				continue
+			try:
+				os.remove(path)
+			except OSError:
+				continue
+			total -= size
+			evicted += 1
+			root_logger.debug("Evicted cache entry %s." % path)
+		return evicted
+
+
+class JuggleFestStats(object):
+
+	''' Counters and per-phase wall time of a scheduler's runs '''
+
+	def __init__(self):
+		self.proposals = 0
+		self.displacements = 0
+		self.rounds = 0
+		self.fallbacks = 0
+		# Phase name -> seconds, in the order phases first ran. Phases can
+		# nest (fits and fallback run inside match).
+		self.phases = []
+		self.phase_times = {}
+		self.peak_rss_kb = None
+
+	@contextmanager
+	def timed(self, phase):
+		''' Add the wall time of a with block to a phase '''
+		start = time.time()
+		try:
+			yield
+		finally:
+			if phase not in self.phase_times:
+				self.phases.append(phase)
+				self.phase_times[phase] = 0.0
+			self.phase_times[phase] += time.time() - start
+			self.peak_rss_kb = peak_rss_kb()
+
+	def as_dict(self):
+		''' The counters as a plain dict '''
+		return {
+			"proposals": self.proposals,
+			"displacements": self.displacements,
+			"rounds": self.rounds,
+			"fallbacks": self.fallbacks,
+			"phases": dict(self.phase_times),
+			"peak_rss_kb": self.peak_rss_kb,
+		}
+
+	def __str__(self):
+		lines = ["proposals: %d" % self.proposals,
+			"displacements: %d" % self.displacements,
+			"rounds: %d" % self.rounds,
+			"fallbacks: %d" % self.fallbacks]
+		lines.extend(["%s: %.3fs" % (phase, self.phase_times[phase]) 
+			for phase in self.phases])
+		if self.peak_rss_kb is not None:
+			lines.append("peak memory: %d KiB" % self.peak_rss_kb)
+		return '\n'.join(lines)
+
+
+def timed_phase(phase):
+	''' Decorator counting a scheduler method's wall time towards a phase
+			of its stats '''
+	def decorate(method):
+		@functools.wraps(method)
+		def timed_method(self, *args, **kwargs):
+			with self.stats.timed(phase):
+				return method(self, *args, **kwargs)
+		return timed_method
+	return decorate
 
 
 class JuggleFestOmnipotentScheduler(object):
 
 	''' Implements Yodle's JuggleFest Challenge '''
 
-	def __init__(self, input_file, verbose=False, logging_file=None, output_file=None):
+	def __init__(self, input_file, verbose=False, logging_file=None, output_file=None,
+			eviction=EVICT_WEAKEST, backend=BACKEND_PYTHON, 
+			fallback=FALLBACK_NONE, workers=DEFAULT_WORKERS, cache_dir=None,
+			cache_bytes=DEFAULT_CACHE_BYTES, checkpoint_file=None, 
+			checkpoint_proposals=CHECKPOINT_PROPOSALS, 
+			checkpoint_seconds=CHECKPOINT_SECONDS, preference_count=None):
 		self.input_file = input_file
 		self.verbose = verbose
 		self.logging_file = logging_file
 		self.output_file = output_file
-		self.circuits = []
-		self.jugglers = []
+		self.eviction = eviction
+		self.backend = backend
+		self.fallback = fallback
+		self.workers = workers
+		# Jugglers listing fewer circuits get their best fits added up to 
+		# this many; None requires complete lists in the inputfile
+		self.preference_count = preference_count
+		self.cache = (None if cache_dir is None else 
+			ResultCache(cache_dir, cache_bytes))
+		# Checkpoints of juggle() are written every checkpoint_proposals 
+		# proposals or checkpoint_seconds seconds, whichever comes first
+		self.checkpoint_file = checkpoint_file
+		self.checkpoint_proposals = checkpoint_proposals
+		self.checkpoint_seconds = checkpoint_seconds
+		# Result cache key of the inputfile; set by load_cached()
+		self._cache_key = None
+		self._cache_hit = False
+		self.instance = JuggleFestInstance()
+		self.circuits = EntityViews(self.instance, Circuit)
+		self.jugglers = EntityViews(self.instance, Juggler)
+		# Juggler x preference fits (numpy backend only)
+		self.fits = None
+		# Proposal engine state; None until juggle() seeds the free queue
+		self._free = None
+		# Rejected jugglers the fallback phase has yet to seat; None until it
+		# has looked at every juggler once
+		self._leftovers = None
+		self.stats = JuggleFestStats()
 
 		# Setup Logging Environment
-		if self.logging_file is not None:
-			# Attach File Logger
-			self._init_file_logging()
-		if self.verbose:
-			# Attach Console Logger
-			self._init_console_logging()
-		else:
-			# Use a base logger
-			error_formatter = logging.Formatter("%(levelname)s:%(message)s")
-			error_handler = logging.StreamHandler()
-			error_handler.setFormatter(error_formatter)
-			error_handler.setLevel(logging.ERROR)
-			root_logger.addHandler(error_handler)
+		init_logging(self.verbose, self.logging_file)
 
 		# Vocalize
 		root_logger.debug("JuggleFest v%s by Brendan Ashby has loaded." % VERSION)
 		root_logger.debug("Logging to File: %s. Verbose Logging to Console: %s."
 			% (self.logging_file is not None, self.verbose))
 
-	def parse_input_file(self):
-		''' Read in juggler and circuit listing; construct helper classes '''
+	@property
+	def proposals(self):
+		return self.stats.proposals
+
+	@property
+	def rounds(self):
+		return self.stats.rounds
+
+	@property
+	def fallbacks(self):
+		return self.stats.fallbacks
+
+	@timed_phase("parse")
+	def parse_input_file(self, fast=True):
+		''' Read in juggler and circuit listing; construct helper classes 
+
+		The fast path parses the file in large blocks straight into the 
+		instance arrays. Anything it can not take in bulk (ragged preference
+		lists, circuits after jugglers, malformed records) is handed to the
+		line parser, which reports errors with line numbers.
+		'''
 		try:
-			with open(self.input_file, "r") as f:
-				for line in f:
-					try:
-						if len(line.strip()) == 0:  # Ignore blank lines
-							continue
-						data = line.split()
-						if data[0] == 'C':
-							self.circuits.append(
-								Circuit(
-									int(data[1][1:]),
-									int(data[2][2:]),
-									int(data[3][2:]),
-									int(data[4][2:])))
-							root_logger.debug("Created Circuit: %s" % 
-								(self.circuits[-1]))
-						elif data[0] == 'J':
-							# Assumes that circuits all came first.
-							# Which I was told I can assume.
-							self.jugglers.append(
-								Juggler(
-									int(data[1][1:]), 
-									int(data[2][2:]), 
-									int(data[3][2:]), 
-									int(data[4][2:]), 
-									[self.circuits[int(p[1:])] for p in 
-										data[5].split(',')]))
-							root_logger.debug("Created Juggler: %s" % 
-								(self.jugglers[-1]))
-					except IndexError:
-						root_logger.error("Error parsing line in inputfile: %s"
-							% line)
-						raise FileParseFailure()
+			if not fast or not self._parse_blocks():
+				if fast:
+					root_logger.debug("Bulk parse declined; parsing line by line.")
+				self._set_instance(JuggleFestInstance())
+				self._parse_lines()
 		except IOError:
 			root_logger.error("Failed to open the inputfile.")
 			raise FileReadFailure()
@@ -189,85 +1287,1178 @@ class JuggleFestOmnipotentScheduler(object):
 		# Alert of parsing status
 		root_logger.debug("%d circuits and %d jugglers parsed from inputfile."
 			% (len(self.circuits), len(self.jugglers)))
+		if self.preference_count:
+			self.complete_preferences(self.preference_count)
+		self._set_max_jugglers()
+
+	def write_snapshot(self, path=None):
+		''' Write the parsed instance to a binary snapshot next to the 
+				inputfile (or to path) so later runs can skip parsing '''
+		if not SNAPSHOTS_SUPPORTED:
+			root_logger.warning("Snapshots are not supported on this platform.")
+			return False
+		path = snapshot_path(self.input_file) if path is None else path
+		source = os.stat(self.input_file)
+		self.instance.write_snapshot(path, source.st_size, source.st_mtime, 
+			preference_count=self.preference_count or 0)
+		root_logger.debug("Wrote snapshot of inputfile to %s." % path)
+		return True
+
+	@timed_phase("load")
+	def load_snapshot(self, path=None):
+		''' Load the instance from a binary snapshot instead of parsing the
+				inputfile. Returns False, leaving the scheduler untouched, if 
+				there is no snapshot or it does not match the inputfile. '''
+		path = snapshot_path(self.input_file) if path is None else path
+		if not SNAPSHOTS_SUPPORTED or not os.path.exists(path):
+			return False
+		try:
+			source = os.stat(self.input_file)
+			instance, fresh = JuggleFestInstance.read_snapshot(path)
+		except (IOError, OSError, ValueError, struct.error) as e:
+			root_logger.warning("Ignoring unreadable snapshot: %s" % e)
+			return False
+		# Lists completed to another count (or none) are stale as well
+		if fresh != (source.st_size, source.st_mtime, self.preference_count or 0):
+			root_logger.debug("Snapshot %s is stale; ignoring it." % path)
+			return False
+		self._set_instance(instance)
+		root_logger.debug("%d circuits and %d jugglers loaded from snapshot %s."
+			% (len(self.circuits), len(self.jugglers), path))
+		if self.preference_count:
+			self.complete_preferences(self.preference_count)
+		self._set_max_jugglers()
+		return True
+
+	def write_checkpoint(self):
+		''' Write the state of the matching in progress to checkpoint_file '''
+		source = os.stat(self.input_file)
+		try:
+			self.instance.write_checkpoint(self.checkpoint_file, self._free, 
+				source.st_size, source.st_mtime, self.stats.proposals, 
+				self.stats.rounds, self.eviction)
+		except (IOError, OSError) as e:
+			root_logger.error("Failed to write checkpoint: %s" % e)
+			raise FileWriteFailure()
+		root_logger.debug("Checkpointed %d proposal(s) to %s." % 
+			(self.stats.proposals, self.checkpoint_file))
+
+	def clear_checkpoint(self):
+		''' Delete checkpoint_file once the matching no longer needs it '''
+		if os.path.exists(self.checkpoint_file):
+			os.remove(self.checkpoint_file)
+			root_logger.debug("Removed checkpoint %s." % self.checkpoint_file)
+
+	@timed_phase("load")
+	def resume(self, path=None):
+		''' Continue the matching saved in a checkpoint (by default 
+				checkpoint_file) of the parsed inputfile. Returns False, 
+				leaving a fresh start, if there is no usable checkpoint. '''
+		path = self.checkpoint_file if path is None else path
+		if self._cache_hit:
+			# The cached matching is already complete
+			return False
+		if path is None or not os.path.exists(path):
+			root_logger.info("No checkpoint to resume; starting afresh.")
+			return False
+		source = os.stat(self.input_file)
+		try:
+			free, proposals, rounds = self.instance.read_checkpoint(path, 
+				source.st_size, source.st_mtime, self.eviction)
+		except (IOError, OSError, ValueError, struct.error) as e:
+			root_logger.warning("Ignoring unusable checkpoint: %s" % e)
+			return False
+		self._free = deque(free)
+		self.stats.proposals = proposals
+		self.stats.rounds = rounds
+		root_logger.info(("Resumed from %s after %d proposal(s) with %d "
+			"juggler(s) to assign.") % (path, proposals, len(free)))
+		return True
+
+	@timed_phase("load")
+	def load_cached(self):
+		''' Load the solved matching for the inputfile from the result cache.
+				Returns False on a miss (or without a cache); juggle() then
+				solves it and store_cached() adds it. '''
+		if self.cache is None:
+			return False
+		options = dict([(name, getattr(self, name)) 
+			for name in CACHE_KEY_OPTIONS])
+		try:
+			self._cache_key = self.cache.key(self.input_file, options)
+		except IOError:
+			root_logger.error("Failed to open the inputfile.")
+			raise FileReadFailure()
+		instance = self.cache.load(self._cache_key)
+		if instance is None:
+			root_logger.info("Result cache miss for %s (%s)." % 
+				(self.input_file, self._cache_key[:12]))
+			return False
+		root_logger.info("Result cache hit for %s (%s)." % 
+			(self.input_file, self._cache_key[:12]))
+		instance.rebuild_rosters()
+		self._set_instance(instance)
+		self._set_max_jugglers()
+		# The matching is complete; juggle() has nothing left to propose
+		self._free = deque()
+		self._cache_hit = True
+		return True
 
+	def store_cached(self):
+		''' Add the solved matching to the result cache, unless it came from
+				there or has had incremental updates '''
+		if self._cache_key is None or self._cache_hit or self.instance.removed:
+			return False
+		try:
+			stored = self.cache.store(self._cache_key, self.instance)
+		except (IOError, OSError) as e:
+			root_logger.warning("Failed to store result in cache: %s" % e)
+			return False
+		if stored:
+			root_logger.info("Stored result for %s in cache (%s)." % 
+				(self.input_file, self._cache_key[:12]))
+		return stored
+
+	def _set_max_jugglers(self):
+		''' [Private] Size circuit rosters evenly across the jugglers '''
 		# Determine max participants per circuit
 		# Told to assume there are no remainders here.
 		if len(self.circuits) != 0:
-			max_jugglers = len(self.jugglers) / len(self.circuits)
+			max_jugglers = len(self.jugglers) // len(self.circuits)
 			root_logger.debug("Max jugglers per circuit set to %d." % 
 				max_jugglers)
-			for circuit in self.circuits:
-				circuit.max_jugglers = max_jugglers
-
-	def _init_file_logging(self):
-		''' [Private] Initializes file-based logging if requested at 
-				instantiation '''
-		fmt = ("%(asctime)s:%(levelname)s:%(module)s.%(funcName)s@L"
-			"%(lineno)d:%(message)s")
-		full_formatter = logging.Formatter(fmt)
-		file_handler = logging.FileHandler(self.logging_file)
-		file_handler.setFormatter(full_formatter)
-		root_logger.addHandler(file_handler)
-
-	def _init_console_logging(self):
-		''' [Private] Initializes console-based logging if requested at 
-				instantiation '''
-		fmt = "%(levelname)s:%(module)s.%(funcName)s@L%(lineno)d:%(message)s"
-		clean_formatter = logging.Formatter(fmt)
-		console_handler = logging.StreamHandler(stream=sys.stdout)
-		console_handler.setFormatter(clean_formatter)
-		console_handler.setLevel(logging.DEBUG)
-		root_logger.addHandler(console_handler)
+			self.instance.max_jugglers = max_jugglers
+
+	def _set_instance(self, instance):
+		''' [Private] Replace the instance and the views over it '''
+		self.instance = instance
+		self.circuits = EntityViews(instance, Circuit)
+		self.jugglers = EntityViews(instance, Juggler)
+		self._leftovers = None
+
+	def _parse_lines(self):
+		''' [Private] Line by line parser; the reference for the input format '''
+		debug = root_logger.isEnabledFor(logging.DEBUG)
+		with open(self.input_file, "r") as f:
+			for line_number, line in enumerate(f, 1):
+				try:
+					if len(line.strip()) == 0:  # Ignore blank lines
+						continue
+					data = line.split()
+					if data[0] == 'C':
+						index = self.instance.add_circuit(
+							int(data[1][1:]),
+							int(data[2][2:]),
+							int(data[3][2:]),
+							int(data[4][2:]))
+						if debug:
+							root_logger.debug("Created Circuit: %s", 
+								self.circuits[index])
+					elif data[0] == 'J':
+						# Assumes that circuits all came first.
+						# Which I was told I can assume.
+						if len(data) < 6 and self.preference_count:
+							# Generated by complete_preferences()
+							preferences = []
+						else:
+							preferences = [int(p[1:]) 
+								for p in data[5].split(',')]
+						if preferences and (min(preferences) < 0 or 
+								max(preferences) >= self.instance.num_circuits):
+							raise IndexError(preferences)
+						index = self.instance.add_juggler(
+							int(data[1][1:]), 
+							int(data[2][2:]), 
+							int(data[3][2:]), 
+							int(data[4][2:]), 
+							preferences)
+						if debug:
+							root_logger.debug("Created Juggler: %s", 
+								self.jugglers[index])
+				except (IndexError, ValueError):
+					root_logger.error("Error parsing line %d in inputfile: %s"
+						% (line_number, line))
+					raise FileParseFailure()
+
+	def _parse_blocks(self):
+		''' [Private] Bulk parser. Reads the file in PARSE_CHUNK_SIZE blocks
+				cut at line boundaries and converts each block's circuit and
+				juggler records with one integer scan. Returns False, leaving
+				the current instance untouched, if the line parser is needed. '''
+		instance = JuggleFestInstance()
+		in_jugglers = False
+		carry = b''
+		with open(self.input_file, "rb") as f:
+			while True:
+				chunk = f.read(PARSE_CHUNK_SIZE)
+				block = carry + chunk
+				if chunk:
+					cut = block.rfind(b'\n') + 1
+					block, carry = block[:cut], block[cut:]
+				# Signs are dropped by parse_integers()
+				if b'-' in block:
+					return False
+				if block and not in_jugglers:
+					# Circuits all come first; split off the circuit records
+					if block[:1] == b'J':
+						split = 0
+					else:
+						split = block.find(b'\nJ') + 1 or len(block)
+					if not self._bulk_circuits(instance, block[:split]):
+						return False
+					block = block[split:]
+					in_jugglers = bool(block)
+				if block and not self._bulk_jugglers(instance, block):
+					return False
+				if not chunk:
+					break
+		self._set_instance(instance)
+		return True
+
+	def _bulk_circuits(self, instance, block):
+		''' [Private] Append a block of circuit records to an instance '''
+		records = count_records(block, b'C')
+		# Every field must belong to a record of five, or the line parser 
+		# decides what to make of the block
+		if count_fields(block) != records * 5:
+			return False
+		if records == 0:
+			return True
+		values = parse_integers(block)
+		if len(values) != records * 4 or block.count(b':') != records * 3:
+			return False
+		instance.extend_circuits(record_columns(values, 4, 0),
+			record_columns(values, 4, 1, 4))
+		root_logger.debug("Bulk parsed %d circuit(s).", records)
+		return True
+
+	def _bulk_jugglers(self, instance, block):
+		''' [Private] Append a block of juggler records to an instance '''
+		records = count_records(block, b'J')
+		if count_records(block, b'C'):
+			return False
+		if records == 0:
+			return True
+		values = parse_integers(block)
+		stride = len(values) // records
+		width = stride - 4
+		# Lists may be left out entirely when they are generated; otherwise
+		# each record holds exactly one comma-separated list field
+		if (width < (0 if self.preference_count else 1) or 
+				len(values) != records * stride or 
+				count_fields(block) != records * (6 if width else 5) or 
+				block.count(b':') != records * 3 or 
+				block.count(b',') != records * max(width - 1, 0) or
+				instance.width not in (0, width)):
+			return False
+		preferences = record_columns(values, stride, 4, stride)
+		if not len(preferences):
+			lowest = highest = 0
+		elif numpy is not None and isinstance(preferences, numpy.ndarray):
+			lowest, highest = preferences.min(), preferences.max()
+		else:
+			lowest, highest = min(preferences), max(preferences)
+		if lowest < 0 or highest >= instance.num_circuits:
+			return False
+		instance.width = width
+		instance.extend_jugglers(record_columns(values, stride, 0),
+			record_columns(values, stride, 1, 4), preferences)
+		root_logger.debug("Bulk parsed %d juggler(s).", records)
+		return True
+
+	@timed_phase("rank")
+	def complete_preferences(self, count):
+		''' Extend every preference list shorter than count circuits with 
+				the juggler's best-fitting circuits that it does not list yet
+				(ties going to the lower circuit index), best first. Returns
+				the number of jugglers whose list grew. 
 
+		With numpy the fits are ranked in blocks of at most 
+		RANK_BLOCK_CELLS: one matrix product per block of jugglers and 
+		circuits, and an argpartition that keeps each juggler's running 
+		top count. The full jugglers x circuits matrix is never built.
+		'''
+		instance = self.instance
+		count = min(count, instance.num_circuits)
+		width = max(instance.width, count)
+		short = [j for j in xrange(instance.num_jugglers) 
+			if j not in instance.removed and 
+			len(instance.juggler_preferences(j)) < count]
+		if not short:
+			return 0
+		dtype = None if numpy is None else self._rank_dtype()
+		if dtype is not None:
+			rows = as_numpy(instance.preferences).reshape(
+				instance.num_jugglers, instance.width)
+			preferences = numpy.full((instance.num_jugglers, width), -1, 
+				dtype=numpy.int32)
+			preferences[:, :instance.width] = rows
+			short = numpy.asarray(short)
+			lengths = (rows[short] >= 0).sum(axis=1)
+			block_rows = max(1, RANK_BLOCK_CELLS // 
+				min(instance.num_circuits, RANK_BLOCK_CIRCUITS))
+			for start in xrange(0, len(short), block_rows):
+				block = short[start:start + block_rows]
+				needed = count - lengths[start:start + block_rows]
+				best = self._rank_circuits(block, rows[block], count, dtype)
+				picks, ranks = numpy.nonzero(
+					numpy.arange(count)[None, :] < needed[:, None])
+				preferences[block[picks], 
+					lengths[start:start + block_rows][picks] + ranks] = \
+					best[picks, ranks]
+			preferences = as_array('i', preferences.ravel())
+		else:
+			preferences = array('i')
+			wanted = set(short)
+			for juggler in xrange(instance.num_jugglers):
+				listed = instance.juggler_preferences(juggler)
+				if juggler in wanted:
+					taken = set(listed)
+					listed += heapq.nsmallest(count - len(listed), 
+						[c for c in xrange(instance.num_circuits) 
+						if c not in taken], 
+						key=lambda c: (-instance.fit(juggler, c), c))
+				preferences.extend(listed)
+				preferences.extend([-1] * (width - len(listed)))
+		instance.preferences = preferences
+		instance.width = width
+		instance.listings = None
+		self.fits = None
+		root_logger.debug("Generated preferences for %d juggler(s), %d each."
+			% (len(short), count))
+		return len(short)
+
+	def _rank_dtype(self):
+		''' [Private] Fit and circuit index are folded into one sort key, 
+				fit * circuits + (circuits - 1 - index), so that ties break 
+				exactly. float64 (BLAS products) while that key stays exact, 
+				int64 while it fits, else None for the Python ranking. '''
+		instance = self.instance
+		highest = [max(skills) if len(skills) else 0 for skills in 
+			(instance.juggler_skills, instance.circuit_skills)]
+		keys = (3 * max(highest[0], 1) * max(highest[1], 1) + 1) * \
+			instance.num_circuits
+		if keys < 1 << 53:
+			return numpy.float64
+		if keys < 1 << 63:
+			return numpy.int64
+		return None
+
+	def _rank_circuits(self, jugglers, listed, count, dtype):
+		''' [Private] (len(jugglers), count) array of each juggler's best 
+				fitting circuits not in its row of listed, best first and 
+				padded with -1, ranked on _rank_dtype() keys. '''
+		instance = self.instance
+		circuits = instance.num_circuits
+		circuit_skills = as_numpy(instance.circuit_skills).reshape(-1, 3)
+		juggler_skills = as_numpy(instance.juggler_skills).reshape(-1, 3)[
+			jugglers]
+		juggler_skills = juggler_skills.astype(dtype)
+		rows = numpy.arange(len(jugglers))[:, None]
+		best_keys = numpy.full((len(jugglers), count), -1, dtype=dtype)
+		best = numpy.full((len(jugglers), count), -1, dtype=numpy.int64)
+		for start in xrange(0, circuits, RANK_BLOCK_CIRCUITS):
+			stop = min(circuits, start + RANK_BLOCK_CIRCUITS)
+			keys = juggler_skills.dot(circuit_skills[start:stop].T.astype(
+				dtype))
+			keys *= circuits
+			keys += circuits - 1 - numpy.arange(start, stop, dtype=dtype)
+			# Listed circuits drop below every real key
+			inside = (listed >= start) & (listed < stop)
+			hits, cols = numpy.nonzero(inside)
+			keys[hits, listed[hits, cols] - start] = -1
+			width = stop - start
+			if width > count:
+				top = numpy.argpartition(keys, width - count, axis=1)[
+					:, width - count:]
+			else:
+				top = numpy.broadcast_to(numpy.arange(width), keys.shape)
+			merged_keys = numpy.concatenate((best_keys, keys[rows, top]), 
+				axis=1)
+			merged = numpy.concatenate((best, top + start), axis=1)
+			# Keep the top count; a ragged last block adds fewer than count
+			keep = numpy.argpartition(merged_keys, merged_keys.shape[1] - count,
+				axis=1)[:, -count:]
+			best_keys, best = merged_keys[rows, keep], merged[rows, keep]
+		order = numpy.argsort(-best_keys, axis=1)
+		best_keys, best = best_keys[rows, order], best[rows, order]
+		best[best_keys < 0] = -1
+		return best
+
+	@timed_phase("fits")
+	def compute_fits(self):
+		''' Precompute every juggler x preference fit with the numpy backend.
+
+		Skill values are viewed as (N,3) and (C,3) arrays and preferences
+		as an (N,P) int32 circuit index array padded with -1, without copying
+		the instance's arrays. The fits are
+		gathered and summed one skill column at a time, so the only
+		temporaries are (N,P) rather than (N,P,3).
+		'''
+		if numpy is None:
+			root_logger.error("The numpy backend requires numpy to be installed.")
+			raise BackendUnavailable()
+		instance = self.instance
+		circuit_skills = as_numpy(instance.circuit_skills).reshape(-1, 3)
+		juggler_skills = as_numpy(instance.juggler_skills).reshape(-1, 3)
+		preferences = as_numpy(instance.preferences).reshape(
+			instance.num_jugglers, instance.width)
+
+		fits = numpy.zeros(preferences.shape, dtype=numpy.int64)
+		if fits.size:
+			for col in range(3):
+				fits += (juggler_skills[:, col, None].astype(numpy.int64) * 
+					circuit_skills[:, col][preferences])
+			fits[preferences < 0] = 0
+		self.fits = fits
+		root_logger.debug("Computed %d x %d fit matrix." % fits.shape)
+		return fits
+
+	@timed_phase("match")
 	def juggle(self, candidates=None):
-		''' Core execution loop. Assigns jugglers to circuits. '''
-		if candidates is None:
-			candidates = self.jugglers
-		
+		''' Core execution loop. Assigns jugglers to circuits.
+
+		Free jugglers wait in a FIFO worklist and propose to their preferences
+		in order, resuming from where they last left off. One round is one
+		wave of the worklist, i.e. the jugglers displaced by the previous 
+		round. The engine state lives on the scheduler, so calling juggle()
+		again (optionally with extra candidates) continues the same matching.
+		'''
+		instance = self.instance
+		if self._free is None:
+			if self.workers > 1 and candidates is None and self._parallel_ok():
+				# Later calls continue serially from the parallel result
+				self.juggle_parallel()
+				self._free = deque()
+			else:
+				# Fits are precomputed once, before matching starts
+				if self.backend == BACKEND_NUMPY and self.fits is None:
+					self.compute_fits()
+				self._free = deque(xrange(instance.num_jugglers) 
+					if candidates is None else [])
+		if candidates is not None:
+			self._free.extend([j.index for j in candidates])
+		restart = self.eviction == EVICT_FIRST
+		free = self._free
+		# Scalar lookups into the fit matrix return plain ints
+		fit_of = None if self.fits is None else self.fits.item
+		width = instance.width
+		preferences = instance.preferences
+		cursors = instance.cursors
+		assignment = instance.assignment
+		nums = instance.juggler_nums
+		circuit_nums = instance.circuit_nums
+		stats = self.stats
+		leftovers = self._leftovers
+		moves = instance.moves
+		proposals = displacements = 0
+		debug = root_logger.isEnabledFor(logging.DEBUG)
+		checkpointing = self.checkpoint_file is not None and bool(free)
+		if checkpointing:
+			every = self.checkpoint_proposals or float("inf")
+			deadline = time.time() + (self.checkpoint_seconds or float("inf"))
+			# The clock is only read every CHECKPOINT_CLOCK_STRIDE proposals
+			due = min(every, CHECKPOINT_CLOCK_STRIDE)
+
 		# Juggle Loop
-		reassign = []
-		for j in candidates:
-			for p in j.preferences:
-				fit = j.dot_product(p)
-				# If there is room, add as participant
-				if len(p.jugglers) < p.max_jugglers:
-					p.jugglers.append((j, fit))
-					root_logger.debug("Assigned J%d to C%d with fit %d." % 
-						(j.num, p.num, fit))
+		while free:
+			stats.rounds += 1
+			if debug:
+				root_logger.debug("Round %d: %d juggler(s) to assign.", 
+					stats.rounds, len(free))
+			for _ in xrange(len(free)):
+				j = free.popleft()
+				row = j * width
+				while cursors[j] < width:
+					k = cursors[j]
+					p = preferences[row + k]
+					if p < 0:  # End of a short preference list
+						cursors[j] = width
+						break
+					if fit_of is None:
+						fit = instance.fit(j, p)
+					else:
+						fit = fit_of(j, k)
+					cursors[j] = k + 1
+					proposals += 1
+					admitted, displaced = instance.admit(p, j, fit, self.eviction)
+					if not admitted:
+						continue
+					if moves is not None:
+						moves.setdefault(j, assignment[j])
+					assignment[j] = p
+					if displaced is None:
+						if debug:
+							root_logger.debug("Assigned J%d to C%d with fit %d.",
+								nums[j], circuit_nums[p], fit)
+					else:
+						displacements += 1
+						if moves is not None:
+							moves.setdefault(displaced, p)
+						assignment[displaced] = -1
+						# A displaced juggler can only be beaten again by the
+						# heap, so it resumes at its next preference. The
+						# legacy scan can readmit it, so it starts over.
+						if restart:
+							cursors[displaced] = 0
+						free.append(displaced)
+						if debug:
+							root_logger.debug("Assigned J%d to C%d with fit %d. "
+								"Displaced J%d.", nums[j], circuit_nums[p], fit, 
+								nums[displaced])
 					break
-				else:
-					# If no room, see if better fit
-					replaced = False
-					for idx, participant in enumerate(p.jugglers):
-						# If current participant is a weaker match to this
-						# circuit, reassign
-						if participant[1] < fit:
-							reassign.append(participant[0])
-							p.jugglers[idx] = (j, fit)
-							replaced = True
-							root_logger.debug(("Assigned J%d to C%d with " 
-								"fit %d. Displaced J%d.") % 
-								(j.num, p.num, fit, participant[0].num))
+				if assignment[j] < 0:
+					if debug:
+						root_logger.debug("J%d exhausted its preferences.", nums[j])
+					if leftovers is not None:
+						leftovers.add(j)
+				# Between jugglers the queue, cursors and rosters agree
+				if checkpointing and proposals >= due:
+					if proposals < every and time.time() < deadline:
+						due = min(every, proposals + CHECKPOINT_CLOCK_STRIDE)
+						continue
+					stats.proposals += proposals
+					stats.displacements += displacements
+					proposals = displacements = 0
+					self.write_checkpoint()
+					deadline = time.time() + (self.checkpoint_seconds or 
+						float("inf"))
+					due = min(every, CHECKPOINT_CLOCK_STRIDE)
+		stats.proposals += proposals
+		stats.displacements += displacements
+		if checkpointing:
+			self.clear_checkpoint()
+
+		root_logger.debug("Matching stable after %d proposal(s) in %d round(s)."
+			% (stats.proposals, stats.rounds))
+		if self.fallback == FALLBACK_BEST_FIT:
+			self.place_leftovers()
+
+	def _parallel_ok(self):
+		''' [Private] Whether the parallel engine can reproduce the serial 
+				matching for this scheduler '''
+		if numpy is None:
+			root_logger.error("Parallel juggling requires numpy to be installed.")
+			raise BackendUnavailable()
+		if self.eviction != EVICT_WEAKEST:
+			root_logger.warning(("The '%s' eviction policy depends on proposal "
+				"order; juggling serially.") % self.eviction)
+			return False
+		if self.checkpoint_file is not None:
+			root_logger.warning("Checkpoints are taken by the serial engine; "
+				"juggling serially.")
+			return False
+		return True
+
+	def juggle_parallel(self, workers=None):
+		''' Assign jugglers to circuits in synchronous rounds across worker
+				processes.
+
+		Every free juggler proposes to its next preference at once, and 
+		circuit c is resolved by worker c % workers, which keeps that 
+		circuit's roster between rounds. Skills are shared with the workers 
+		once through shared memory; only the proposals of a round and the 
+		jugglers it frees travel over the pipes. With the weakest eviction 
+		policy deferred acceptance ends in the same juggler-optimal matching
+		whatever the proposal order, so the assignment (and the number of 
+		proposals) matches juggle().
+		'''
+		instance = self.instance
+		stats = self.stats
+		workers = self.workers if workers is None else workers
+		width = instance.width
+		preferences = as_numpy(instance.preferences).reshape(
+			instance.num_jugglers, width)
+		cursors = numpy.array(instance.cursors, dtype=numpy.int32)
+		assignment = numpy.array(instance.assignment, dtype=numpy.int32)
+		circuit_skills = share_array(instance.circuit_skills)
+		juggler_skills = share_array(instance.juggler_skills)
+
+		connections, processes = [], []
+		try:
+			for _ in xrange(workers):
+				parent, child = multiprocessing.Pipe()
+				process = multiprocessing.Process(target=resolve_proposals, 
+					args=(child, circuit_skills, juggler_skills, 
+						instance.max_jugglers))
+				process.daemon = True
+				process.start()
+				child.close()
+				connections.append(parent)
+				processes.append(process)
+			root_logger.debug("Started %d juggling worker(s)." % workers)
+
+			free = numpy.flatnonzero(cursors < width).astype(numpy.int32)
+			while free.size:
+				free = free[cursors[free] < width]
+				circuits = preferences[free, cursors[free]]
+				# End of a short preference list
+				exhausted = circuits < 0
+				cursors[free[exhausted]] = width
+				free, circuits = free[~exhausted], circuits[~exhausted]
+				if not free.size:
+					break
+				cursors[free] += 1
+				assignment[free] = circuits
+				stats.proposals += free.size
+				stats.rounds += 1
+				root_logger.debug("Round %d: %d juggler(s) proposing.", 
+					stats.rounds, free.size)
+
+				owners = circuits % workers
+				for worker, connection in enumerate(connections):
+					mine = owners == worker
+					connection.send((free[mine], circuits[mine]))
+				replies = [connection.recv() for connection in connections]
+				free = numpy.concatenate([freed for freed, _ in replies])
+				stats.displacements += sum([count for _, count in replies])
+				assignment[free] = -1
+
+			for connection in connections:
+				connection.send(None)
+			for connection in connections:
+				for circuit, roster in connection.recv().items():
+					instance.rosters[circuit] = roster
+		except (EOFError, IOError, OSError):
+			root_logger.error("A juggling worker failed.")
+			raise JuggleFestException()
+		finally:
+			for connection in connections:
+				connection.close()
+			for process in processes:
+				process.join(1)
+				if process.is_alive():
+					process.terminate()
+
+		instance.cursors = as_array('i', cursors)
+		instance.assignment = as_array('i', assignment)
+		# Rejections were not tracked; the fallback phase looks at everyone
+		self._leftovers = None
+		root_logger.debug(("Matching stable after %d proposal(s) in %d "
+			"parallel round(s).") % (stats.proposals, stats.rounds))
+
+	@timed_phase("fallback")
+	def place_leftovers(self):
+		''' Fallback phase. Places every juggler that was rejected by all of
+				its preferences on the open circuit it fits best (ties going
+				to the lower circuit index), in juggler order. 
+
+		Only circuits with open seats are considered. Once matching is done
+		there are at most as many of those as open seats, so the cost grows
+		with the number of leftovers rather than with every circuit. After
+		the first call only the jugglers the engine has rejected since, and
+		those no seat was left for, are considered, so a repair that rejects
+		no one costs nothing here. Returns the number of jugglers placed.
+		'''
+		instance = self.instance
+		assignment = instance.assignment
+		candidates = (xrange(instance.num_jugglers) if self._leftovers is None
+			else sorted(self._leftovers))
+		leftovers = [j for j in candidates 
+			if assignment[j] < 0 and j not in instance.removed]
+		self._leftovers = set()
+		if not leftovers:
+			return 0
+		open_circuits = [c for c in xrange(instance.num_circuits) 
+			if len(instance.rosters[c]) < instance.max_jugglers]
+		root_logger.debug("Placing %d leftover juggler(s) on %d open circuit(s)."
+			% (len(leftovers), len(open_circuits)))
+		if numpy is not None and open_circuits:
+			choices = self._rank_open_circuits(leftovers, open_circuits)
+		else:
+			choices = self._scan_open_circuits(leftovers, open_circuits)
+
+		placed = 0
+		debug = root_logger.isEnabledFor(logging.DEBUG)
+		for juggler, choice in choices:
+			if choice < 0:
+				if debug:
+					root_logger.debug("No open seat left for J%d.", 
+						instance.juggler_nums[juggler])
+				self._leftovers.add(juggler)
+				continue
+			circuit = open_circuits[choice]
+			fit = instance.fit(juggler, circuit)
+			instance.seat(circuit, juggler, fit)
+			placed += 1
+			if debug:
+				root_logger.debug("Fallback assigned J%d to C%d with fit %d.", 
+					instance.juggler_nums[juggler], 
+					instance.circuit_nums[circuit], fit)
+		self.stats.fallbacks += placed
+		return placed
+
+	def _scan_open_circuits(self, leftovers, open_circuits):
+		''' [Private] Yield (juggler, position in open_circuits or -1) by 
+				scanning the open circuits for each leftover '''
+		instance = self.instance
+		seats = [instance.max_jugglers - len(instance.rosters[c]) 
+			for c in open_circuits]
+		for juggler in leftovers:
+			best, best_fit = -1, None
+			for o, circuit in enumerate(open_circuits):
+				if seats[o] > 0:
+					fit = instance.fit(juggler, circuit)
+					if best_fit is None or fit > best_fit:
+						best, best_fit = o, fit
+			if best >= 0:
+				seats[best] -= 1
+			yield juggler, best
+
+	def _rank_open_circuits(self, leftovers, open_circuits):
+		''' [Private] Vectorized _scan_open_circuits. Leftovers are ranked 
+				in blocks of at most FALLBACK_BLOCK_CELLS fits: one matrix
+				product against the open circuits and an argpartition give 
+				each leftover a short-list of its FALLBACK_TOP_K best circuits.
+				A leftover whose short-list has no open seat (or only ties 
+				with circuits left off the list) falls back to a masked argmax
+				over its row of the block. '''
+		instance = self.instance
+		seats = numpy.array([instance.max_jugglers - len(instance.rosters[c]) 
+			for c in open_circuits])
+		# Fits are exact in float64 for skills below 2**26, and float matrix
+		# products go through BLAS
+		circuit_skills = as_numpy(instance.circuit_skills).reshape(-1, 3)[
+			numpy.asarray(open_circuits)].astype(numpy.float64)
+		juggler_skills = as_numpy(instance.juggler_skills).reshape(-1, 3)
+		k = min(FALLBACK_TOP_K, len(open_circuits) - 1)
+		block_rows = max(1, FALLBACK_BLOCK_CELLS // len(open_circuits))
+		for start in xrange(0, len(leftovers), block_rows):
+			block = leftovers[start:start + block_rows]
+			fits = juggler_skills[numpy.asarray(block)].astype(numpy.float64).dot(
+				circuit_skills.T)
+			rows = numpy.arange(len(block))[:, None]
+			if k > 0:
+				short = numpy.argpartition(-fits, k, axis=1)[:, :k + 1]
+				# Best fit first, lower circuit first on ties; the last entry
+				# is the boundary, which may tie with circuits left off the list
+				short = short[rows, numpy.lexsort((short, -fits[rows, short]), 
+					axis=1)]
+				short_fits = fits[rows, short]
+			for row, juggler in enumerate(block):
+				choice = -1
+				if k > 0:
+					boundary = short_fits[row, k]
+					for o, fit in zip(short[row, :k].tolist(), 
+							short_fits[row, :k].tolist()):
+						if fit <= boundary:
 							break
-					if replaced:
-						break
+						if seats[o] > 0:
+							choice = o
+							break
+				if choice < 0:
+					available = seats > 0
+					if available.any():
+						choice = int(numpy.where(available, fits[row], 
+							fits[row].min() - 1).argmax())
+				if choice >= 0:
+					seats[choice] -= 1
+				yield juggler, choice
+
+	def copy(self, reset=False):
+		''' Scheduler over a copy of the instance and matching (see 
+				JuggleFestInstance.copy), e.g. to try updates without touching
+				this one. With reset the copy's
+				matching is cleared so juggle() solves it from scratch. '''
+		clone = JuggleFestOmnipotentScheduler(self.input_file, 
+			verbose=self.verbose, logging_file=self.logging_file, 
+			output_file=self.output_file, eviction=self.eviction, 
+			backend=self.backend, fallback=self.fallback, workers=self.workers)
+		instance = self.instance.copy()
+		if reset:
+			instance.rosters = [[] for _ in xrange(instance.num_circuits)]
+			instance.assignment = array('i', [-1]) * instance.num_jugglers
+			instance.cursors = array('i', [0]) * instance.num_jugglers
+			for juggler in instance.removed:
+				instance.cursors[juggler] = instance.width
+		else:
+			# The fit matrix is never written in place, so it can be shared
+			clone.fits = self.fits
+			clone._free = None if self._free is None else deque(self._free)
+		clone._set_instance(instance)
+		if not reset and self._leftovers is not None:
+			clone._leftovers = set(self._leftovers)
+		return clone
+
+	def add_juggler(self, number, h, e, p, preferences):
+		''' Add a juggler preferring the given circuit numbers and repair the
+				matching. Only the new juggler's proposal chain is replayed. '''
+		self._prepare_update()
+		preferences = [self.instance.circuit_index(c) for c in preferences]
+		index = self.instance.add_juggler(number, h, e, p, preferences)
+		root_logger.debug("Added J%d; replaying its proposals." % number)
+		self._free.append(index)
+		self.juggle()
+		return self.jugglers[index]
+
+	def remove_juggler(self, number):
+		''' Remove a juggler and repair the matching. The seat it leaves is
+				offered along a vacancy chain (see _fill_vacancies). '''
+		self._prepare_update()
+		instance = self.instance
+		index = instance.juggler_index(number)
+		circuit = instance.assignment[index]
+		if circuit >= 0:
+			instance.withdraw(circuit, index, instance.fit(index, circuit))
+		instance.remove_juggler(index)
+		root_logger.debug("Removed J%d from C%d." % (number, 
+			instance.circuit_nums[circuit] if circuit >= 0 else -1))
+		if circuit >= 0:
+			self._fill_vacancies([circuit])
+		# Nothing to propose; lets the fallback phase run
+		self.juggle()
+
+	def update_juggler(self, number, h, e, p, preferences):
+		''' Change a juggler's skills and preferences; the juggler is removed
+				and re-added under the same number '''
+		self.remove_juggler(number)
+		return self.add_juggler(number, h, e, p, preferences)
+
+	def add_circuit(self, number, h, e, p):
+		''' Add a circuit with the current roster size. No one has it on 
+				their preference list yet, so only the fallback phase (if 
+				any) seats jugglers on it. '''
+		self._prepare_update()
+		index = self.instance.add_circuit(number, h, e, p)
+		root_logger.debug("Added C%d." % number)
+		# Nothing to propose; lets the fallback phase run
+		self.juggle()
+		return self.circuits[index]
+
+	def update_circuit(self, number, h, e, p):
+		''' Recalibrate a circuit's skills and repair the matching. The
+				circuit's roster is emptied and refilled from every juggler 
+				that has proposed to it, ranked by the new fits; the seats 
+				those jugglers leave are refilled by vacancy chains and 
+				members that lose their seat resume proposing after it. '''
+		self._prepare_update()
+		instance = self.instance
+		circuit = instance.circuit_index(number)
+		instance.circuit_skills[circuit * 3:circuit * 3 + 3] = array('l', 
+			(h, e, p))
+		former = [roster_juggler(key) for key in instance.rosters[circuit]]
+		instance.rosters[circuit] = []
+		for juggler in former:
+			instance.assign(juggler, -1)
+		root_logger.debug("Updated C%d; %d member(s) re-ranked." % 
+			(number, len(former)))
+		self._fill_vacancies([circuit])
+		self.juggle(candidates=[self.jugglers[j] for j in former 
+			if instance.assignment[j] < 0])
+
+	def _prepare_update(self):
+		''' [Private] Make sure there is a stable matching to repair '''
+		if self.eviction != EVICT_WEAKEST:
+			root_logger.error("Incremental updates need the '%s' eviction "
+				"policy." % EVICT_WEAKEST)
+			raise JuggleFestException()
+		self.juggle()
+		# Fits change with the instance; later proposals use dot products
+		self.fits = None
 
-		# Recurse, assigning displaced jugglers
-		if reassign:
-			root_logger.debug("I have %d displaced juggler(s) to reassign." % 
-				len(reassign))
-			self.juggle(candidates=reassign)
+	def _fill_vacancies(self, circuits):
+		''' [Private] Offer every open seat on the given circuits to the best
+				juggler that has proposed to the circuit and would rather be 
+				there than where it is now (by cursor order, that is every
+				such juggler not on it). Moving that juggler opens a seat on
+				its old circuit, which is offered the same way, so the chain
+				only touches circuits whose rosters actually change. The 
+				result is stable, but when several stable matchings exist it
+				need not be the juggler-optimal one a full re-solve finds. '''
+		instance = self.instance
+		rosters = instance.rosters
+		assignment = instance.assignment
+		cursors = instance.cursors
+		vacant = deque(circuits)
+		while vacant:
+			circuit = vacant.popleft()
+			if len(rosters[circuit]) >= instance.max_jugglers:
+				continue
+			best, best_fit, best_key, best_position = -1, None, None, -1
+			for juggler in instance.listed_by(circuit):
+				if juggler in instance.removed or assignment[juggler] == circuit:
+					continue
+				position = instance.preference_position(juggler, circuit)
+				if position < 0 or cursors[juggler] <= position:
+					continue
+				fit = instance.fit(juggler, circuit)
+				key = roster_key(fit, juggler)
+				if best_key is None or key > best_key:
+					best, best_fit, best_key, best_position = (juggler, fit, key,
+						position)
+			if best < 0:
+				continue
+			old = assignment[best]
+			if old >= 0:
+				instance.withdraw(old, best, instance.fit(best, old))
+				vacant.append(old)
+			instance.seat(circuit, best, best_fit)
+			cursors[best] = best_position + 1
+			root_logger.debug("Moved J%d to C%d to fill a vacancy.", 
+				instance.juggler_nums[best], instance.circuit_nums[circuit])
+			# The circuit may have more than one open seat
+			vacant.append(circuit)
 
-	def output_answer(self):
+	def answer_lines(self):
+		''' Generate the answer one circuit per line, highest circuit number 
+				first. Each juggler on the circuit (best fit first) is listed
+				with its fit to every circuit it prefers:
+				"C2 J6 C2:128 C1:31 C0:188, J3 C2:120 C0:171 C1:31" '''
+		instance = self.instance
+		circuit_nums = instance.circuit_nums
+		juggler_nums = instance.juggler_nums
+		fit_of = None if self.fits is None else self.fits.item
+		for circuit in sorted(xrange(instance.num_circuits), 
+				key=circuit_nums.__getitem__, reverse=True):
+			entries = []
+			for key in sorted(instance.rosters[circuit], reverse=True):
+				juggler = roster_juggler(key)
+				preferences = instance.juggler_preferences(juggler)
+				entries.append("J%d %s" % (juggler_nums[juggler], ' '.join([
+					"C%d:%d" % (circuit_nums[p], instance.fit(juggler, p) 
+						if fit_of is None else fit_of(juggler, k))
+					for k, p in enumerate(preferences)])))
+			yield "C%d %s\n" % (circuit_nums[circuit], ', '.join(entries))
+
+	@timed_phase("output")
+	def output_answer(self, output_file=None):
 		''' outputs answer to JuggleFest challenge '''
-		pass
+		output_file = self.output_file if output_file is None else output_file
+		if output_file is None:
+			root_logger.debug("No outputfile given; skipping output.")
+			return
+		try:
+			with open(output_file, "w", OUTPUT_BUFFER_SIZE) as f:
+				f.writelines(self.answer_lines())
+		except IOError:
+			root_logger.error("Failed to write the outputfile.")
+			raise FileWriteFailure()
+		root_logger.debug("Wrote answer for %d circuits to %s." % 
+			(len(self.circuits), output_file))
+
+	def circuit_juggler_sum(self, number):
+		''' Sum of the juggler numbers assigned to circuit C<number> '''
+		return self.instance.juggler_sum(self.instance.circuit_index(number))
 
+	@timed_phase("verify")
+	def verify(self):
+		''' Check the assignment vector for stability. Returns three lists:
+				blocking pairs as (juggler number, circuit number), the 
+				numbers of over-capacity circuits and the numbers of 
+				unassigned jugglers.
+
+		A juggler and circuit block the schedule when the juggler lists the
+		circuit above its current one (anywhere, if it has none) and the 
+		circuit has an open seat or a member with a strictly lower fit. 
+		Each circuit's weakest fit is gathered into one array first, so only
+		the N x P preference matrix is checked, never every circuit.
+		'''
+		instance = self.instance
+		if numpy is not None and instance.num_jugglers and instance.width:
+			blocking, counts = self._blocking_pairs_numpy()
+		else:
+			blocking, counts = self._blocking_pairs_python()
+		circuit_nums = instance.circuit_nums
+		juggler_nums = instance.juggler_nums
+		blocking = [(juggler_nums[j], circuit_nums[c]) for j, c in blocking]
+		over_capacity = [circuit_nums[c] for c in xrange(instance.num_circuits)
+			if counts[c] > instance.max_jugglers]
+		unassigned = [juggler_nums[j] for j in self._unassigned()]
+
+		root_logger.debug(("Verified schedule: %d blocking pair(s), %d "
+			"over-capacity circuit(s), %d unassigned juggler(s).") % 
+			(len(blocking), len(over_capacity), len(unassigned)))
+		for juggler, circuit in blocking[:10]:
+			root_logger.debug("J%d and C%d block the schedule.", juggler, circuit)
+		return blocking, over_capacity, unassigned
+
+	def _unassigned(self):
+		''' [Private] Indexes of the jugglers left without a circuit '''
+		instance = self.instance
+		if numpy is not None and instance.num_jugglers:
+			unassigned = numpy.flatnonzero(
+				as_numpy(instance.assignment) < 0).tolist()
+		else:
+			unassigned = [j for j in xrange(instance.num_jugglers) 
+				if instance.assignment[j] < 0]
+		return [j for j in unassigned if j not in instance.removed]
+
+	def _weakest_fits(self, fits, counts):
+		''' [Private] Weakest assigned fit per circuit, with open circuits
+				(fewer members than seats) at -1 so any juggler beats them '''
+		instance = self.instance
+		weakest = [-1] * instance.num_circuits
+		for juggler, circuit in enumerate(instance.assignment):
+			if circuit >= 0:
+				fit = fits(juggler, circuit)
+				if counts[circuit] >= instance.max_jugglers and (
+						weakest[circuit] < 0 or fit < weakest[circuit]):
+					weakest[circuit] = fit
+		return weakest
+
+	def _blocking_pairs_python(self):
+		''' [Private] Blocking (juggler, circuit) index pairs and member 
+				counts per circuit, one juggler at a time '''
+		instance = self.instance
+		counts = [0] * instance.num_circuits
+		for circuit in instance.assignment:
+			if circuit >= 0:
+				counts[circuit] += 1
+		weakest = self._weakest_fits(instance.fit, counts)
+		blocking = []
+		for juggler in xrange(instance.num_jugglers):
+			current = instance.assignment[juggler]
+			for circuit in instance.juggler_preferences(juggler):
+				if circuit == current:
+					break
+				if instance.fit(juggler, circuit) > weakest[circuit]:
+					blocking.append((juggler, circuit))
+		return blocking, counts
+
+	def _blocking_pairs_numpy(self):
+		''' [Private] Vectorized _blocking_pairs_python. The weakest fit per
+				circuit comes from one minimum over the assigned fits, then 
+				the preference matrix is checked in blocks of at most 
+				VERIFY_BLOCK_CELLS fits. '''
+		instance = self.instance
+		width = instance.width
+		assignment = as_numpy(instance.assignment)
+		circuit_skills = as_numpy(instance.circuit_skills).reshape(-1, 3)
+		juggler_skills = as_numpy(instance.juggler_skills).reshape(-1, 3)
+		preferences = as_numpy(instance.preferences).reshape(-1, width)
+
+		assigned = numpy.flatnonzero(assignment >= 0)
+		circuits = assignment[assigned]
+		counts = numpy.bincount(circuits, minlength=instance.num_circuits)
+		weakest = numpy.full(instance.num_circuits, numpy.iinfo(numpy.int64).max)
+		numpy.minimum.at(weakest, circuits, (juggler_skills[assigned].astype(
+			numpy.int64) * circuit_skills[circuits]).sum(axis=1))
+		weakest[counts < instance.max_jugglers] = -1
+
+		blocking = []
+		columns = numpy.arange(width)
+		block_rows = max(1, VERIFY_BLOCK_CELLS // width)
+		for start in xrange(0, instance.num_jugglers, block_rows):
+			prefs = preferences[start:start + block_rows]
+			# Position of the current circuit in each row; width if unlisted
+			current = prefs == assignment[start:start + block_rows, None]
+			position = numpy.where(current.any(axis=1), current.argmax(axis=1),
+				width)
+			# Only the circuits listed above the current one can block
+			rows, cols = numpy.nonzero((columns < position[:, None]) & 
+				(prefs >= 0))
+			circuits = prefs[rows, cols]
+			rows += start
+			fits = (juggler_skills[rows].astype(numpy.int64) * 
+				circuit_skills[circuits]).sum(axis=1)
+			blocks = fits > weakest[circuits]
+			blocking.extend(zip(rows[blocks].tolist(), 
+				circuits[blocks].tolist()))
+		return blocking, counts
+
+
+def batch_inputs(source):
+	''' Inputfiles named by a directory (every file in it) or a glob 
+			pattern, in name order. Snapshots are skipped. '''
+	if os.path.isdir(source):
+		paths = [os.path.join(source, name) for name in os.listdir(source)]
+	else:
+		paths = glob.glob(source)
+	return sorted([path for path in paths if os.path.isfile(path) and 
+		not path.endswith(SNAPSHOT_SUFFIX)])
+
+
+def batch_output_path(inputfile, output_dir):
+	''' Where batch mode writes the answer for an inputfile '''
+	return os.path.join(output_dir, 
+		os.path.basename(inputfile) + BATCH_OUTPUT_SUFFIX)
+
+
+def solve_file(inputfile, output_dir, options, snapshot=False):
+	''' Batch worker. Schedule one inputfile and write its answer into 
+			output_dir. Returns a summary dict; a failure is reported in 
+			its "error" entry rather than raised, so one bad file does not
+			stop the batch. '''
+	start = time.time()
+	summary = {"input": inputfile, "output": None, "circuits": 0, 
+		"jugglers": 0, "assigned": 0, "proposals": 0, "seconds": 0.0, 
+		"error": None}
+	try:
+		scheduler = JuggleFestOmnipotentScheduler(inputfile, 
+			output_file=batch_output_path(inputfile, output_dir), **options)
+		if not scheduler.load_cached() and not scheduler.load_snapshot():
+			scheduler.parse_input_file()
+			if snapshot:
+				scheduler.write_snapshot()
+		scheduler.juggle()
+		scheduler.store_cached()
+		scheduler.output_answer()
+	except JuggleFestException as e:
+		summary["error"] = str(e) or e.__class__.__name__
+	else:
+		instance = scheduler.instance
+		summary.update(output=scheduler.output_file, 
+			circuits=instance.num_circuits, jugglers=instance.num_jugglers,
+			assigned=sum([len(roster) for roster in instance.rosters]),
+			proposals=scheduler.proposals)
+	summary["seconds"] = time.time() - start
+	return summary
+
+
+def _solve_file_star(args):
+	''' [Private] solve_file() for multiprocessing.Pool.imap_unordered '''
+	return solve_file(*args)
+
+
+def schedule_batch(inputs, output_dir, jobs=None, snapshot=False, **options):
+	''' Schedule many inputfiles across a pool of jobs worker processes
+			(default: one per CPU), yielding each file's summary from 
+			solve_file() as soon as it is done. options are passed on to
+			JuggleFestOmnipotentScheduler; each file is matched serially, 
+			as the pool already uses the CPUs. '''
+	options = dict(options, workers=1)
+	jobs = jobs or multiprocessing.cpu_count()
+	if not os.path.isdir(output_dir):
+		os.makedirs(output_dir)
+	tasks = [(inputfile, output_dir, options, snapshot) for inputfile in inputs]
+	if ProcessPoolExecutor is not None:
+		with ProcessPoolExecutor(max_workers=jobs) as executor:
+			futures = [executor.submit(solve_file, *task) for task in tasks]
+			for future in as_completed(futures):
+				yield future.result()
+	else:
+		pool = multiprocessing.Pool(jobs)
+		try:
+			for summary in pool.imap_unordered(_solve_file_star, tasks):
+				yield summary
+		finally:
+			pool.close()
+			pool.join()
+
+
+def batch_summary(summaries):
+	''' Format batch summaries as a table, one inputfile per row '''
+	rows = ["%-32s %9s %9s %9s %10s %8s  %s" % ("inputfile", "circuits", 
+		"jugglers", "assigned", "proposals", "seconds", "status")]
+	for summary in sorted(summaries, key=lambda summary: summary["input"]):
+		rows.append("%-32s %9d %9d %9d %10d %8.3f  %s" % (
+			os.path.basename(summary["input"]), summary["circuits"], 
+			summary["jugglers"], summary["assigned"], summary["proposals"],
+			summary["seconds"], summary["error"] or "ok"))
+	return '\n'.join(rows)
 
 
 if __name__ == '__main__':
 
 	def usage_override(name=None):
-		return """%(prog)s [-h] [-v] [-l [logfile]] inputfile outputfile\n
+		return """%(prog)s [-h] [-v] [-l [logfile]] [-e {{weakest,first}}]
+           [-b {{python,numpy}}] [-f {{none,best-fit}}]
+           [-s] [-c number] [-w workers] [--verify] [--stats]
+           [--profile [profile]] [--batch [-j jobs]]
+           [--cache [cachedir]] [--cache-size MiB]
+           [--checkpoint] [--checkpoint-every N] [--checkpoint-seconds T]
+           [--resume] [-g K]
+           inputfile outputfile\n
            _                   _      ______        _
           | |                 | |    |  ____|      | |
           | |_   _  __ _  __ _| | ___| |__ ___  ___| |_
@@ -286,7 +2477,8 @@ if __name__ == '__main__':
 		epilog="""[Note] If \'--log\' is supplied without an arugment, then a
 			default filename (jugglefest.log) is used for logging. When 
 			using the default filename, avoid argparse ambiguity by suppling 
-			\'--log\' as the last argument (after \'outputfile\').""")
+			\'--log\' as the last argument (after \'outputfile\'). The same
+			goes for \'--profile\' (default: jugglefest.prof) and \'--cache\'.""")
 	parser.add_argument(
 		"-v",
 		"--verbose",
@@ -303,6 +2495,156 @@ if __name__ == '__main__':
 		dest="logfile",
 		metavar="logfile",
 		help="should I log my actions to a logfile? [default: no]")
+	parser.add_argument(
+		"-e",
+		"--eviction",
+		choices=EVICTION_POLICIES,
+		default=EVICT_WEAKEST,
+		dest="eviction",
+		help=("which participant a better fitting juggler displaces from a "
+			"full circuit; '%s' reproduces the original linear scan order "
+			"[default: %%(default)s]" % EVICT_FIRST))
+	parser.add_argument(
+		"-b",
+		"--backend",
+		choices=BACKENDS,
+		default=BACKEND_PYTHON,
+		dest="backend",
+		help=("how juggler to circuit fits are computed; '%s' precomputes "
+			"them all in one vectorized pass [default: %%(default)s]" % 
+			BACKEND_NUMPY))
+	parser.add_argument(
+		"-f",
+		"--fallback",
+		choices=FALLBACK_MODES,
+		default=FALLBACK_NONE,
+		dest="fallback",
+		help=("what to do with jugglers rejected by every circuit they "
+			"prefer; '%s' places them on the open circuit they fit best "
+			"[default: %%(default)s]" % FALLBACK_BEST_FIT))
+	parser.add_argument(
+		"-s",
+		"--snapshot",
+		action="store_true",
+		default=False,
+		dest="snapshot",
+		help=("should I save a binary snapshot next to inputfile after "
+			"parsing it? A fresh snapshot is always used instead of parsing "
+			"[default: no]"))
+	parser.add_argument(
+		"-c",
+		"--circuit",
+		type=int,
+		default=None,
+		dest="circuit",
+		metavar="number",
+		help=("print the sum of the juggler numbers assigned to circuit "
+			"C<number> [default: no]"))
+	parser.add_argument(
+		"-w",
+		"--workers",
+		type=int,
+		default=DEFAULT_WORKERS,
+		dest="workers",
+		metavar="workers",
+		help=("how many worker processes resolve proposals in parallel "
+			"rounds; needs numpy and the '%s' eviction policy "
+			"[default: %%(default)s]" % EVICT_WEAKEST))
+	parser.add_argument(
+		"--verify",
+		action="store_true",
+		default=False,
+		dest="verify",
+		help=("should I check the schedule for blocking pairs, over-capacity "
+			"circuits and unassigned jugglers after juggling? [default: no]"))
+	parser.add_argument(
+		"--stats",
+		action="store_true",
+		default=False,
+		dest="stats",
+		help=("should I print proposal counts, phase timings and peak "
+			"memory after juggling? [default: no]"))
+	parser.add_argument(
+		"--profile",
+		nargs="?",
+		const="jugglefest.prof",
+		default=None,
+		dest="profile",
+		metavar="profile",
+		help=("should I write a cProfile dump of the run (readable with "
+			"pstats) to a file? [default: no]"))
+	parser.add_argument(
+		"--batch",
+		action="store_true",
+		default=False,
+		dest="batch",
+		help=("should I treat inputfile as a directory or glob pattern of "
+			"inputfiles and outputfile as a directory to write each answer "
+			"(<inputfile>%s) to? [default: no]" % BATCH_OUTPUT_SUFFIX))
+	parser.add_argument(
+		"-j",
+		"--jobs",
+		type=int,
+		default=None,
+		dest="jobs",
+		metavar="jobs",
+		help=("how many inputfiles batch mode schedules at once "
+			"[default: one per CPU]"))
+	parser.add_argument(
+		"--cache",
+		nargs="?",
+		const=DEFAULT_CACHE_DIR,
+		default=None,
+		dest="cache",
+		metavar="cachedir",
+		help=("should I reuse (and store) solved matchings in a result "
+			"cache directory, keyed by inputfile contents and options? "
+			"[default: no; %s if cachedir is omitted]" % DEFAULT_CACHE_DIR))
+	parser.add_argument(
+		"--cache-size",
+		type=int,
+		default=DEFAULT_CACHE_BYTES >> 20,
+		dest="cache_size",
+		metavar="MiB",
+		help=("how large the result cache may grow before the least "
+			"recently used results are deleted [default: %(default)s]"))
+	parser.add_argument(
+		"--checkpoint",
+		action="store_true",
+		default=False,
+		dest="checkpoint",
+		help=("should I checkpoint the matching in progress to "
+			"<inputfile>%s? [default: no]" % CHECKPOINT_SUFFIX))
+	parser.add_argument(
+		"--checkpoint-every",
+		type=int,
+		default=CHECKPOINT_PROPOSALS,
+		dest="checkpoint_proposals",
+		metavar="N",
+		help="checkpoint at least every N proposals [default: %(default)s]")
+	parser.add_argument(
+		"--checkpoint-seconds",
+		type=float,
+		default=CHECKPOINT_SECONDS,
+		dest="checkpoint_seconds",
+		metavar="T",
+		help="checkpoint at least every T seconds [default: %(default)s]")
+	parser.add_argument(
+		"--resume",
+		action="store_true",
+		default=False,
+		dest="resume",
+		help=("should I continue from the last checkpoint of inputfile "
+			"(and keep checkpointing)? [default: no]"))
+	parser.add_argument(
+		"-g",
+		"--generate-preferences",
+		type=int,
+		default=None,
+		dest="preference_count",
+		metavar="K",
+		help=("should I fill in missing or short preference lists with each "
+			"juggler's K best fitting circuits? [default: no]"))
 	parser.add_argument(
 		"inputfile",
 		help="a path to a file of jugglers and circuits to be assigned.")
@@ -314,20 +2656,83 @@ if __name__ == '__main__':
 	# Parse Arguments
 	args = parser.parse_args()
 
+	if args.batch:
+		init_logging(args.verbose, args.logfile)
+		inputs = batch_inputs(args.inputfile)
+		if not inputs:
+			parser.error("no inputfiles match %s" % args.inputfile)
+		summaries = []
+		for summary in schedule_batch(inputs, args.outputfile, 
+				jobs=args.jobs, snapshot=args.snapshot, 
+				verbose=args.verbose, logging_file=args.logfile,
+				eviction=args.eviction, backend=args.backend, 
+				fallback=args.fallback, cache_dir=args.cache, 
+				cache_bytes=args.cache_size << 20, 
+				preference_count=args.preference_count):
+			if summary["error"] is not None:
+				root_logger.error(" A problem was encountered with %s: %s" % 
+					(summary["input"], summary["error"]))
+			summaries.append(summary)
+		print(batch_summary(summaries))
+		sys.exit(1 if any([summary["error"] for summary in summaries]) else 0)
+
 	# Time to Juggle Baby!
 	aGloriousJuggleFestScheduler = JuggleFestOmnipotentScheduler(
 		args.inputfile,
 		verbose=args.verbose,
 		logging_file=args.logfile,
-		output_file=args.outputfile)
+		output_file=args.outputfile,
+		eviction=args.eviction,
+		backend=args.backend,
+		fallback=args.fallback,
+		workers=args.workers,
+		cache_dir=args.cache,
+		cache_bytes=args.cache_size << 20,
+		checkpoint_file=(checkpoint_path(args.inputfile) 
+			if args.checkpoint or args.resume else None),
+		checkpoint_proposals=args.checkpoint_proposals,
+		checkpoint_seconds=args.checkpoint_seconds,
+		preference_count=args.preference_count)
 	
+	if args.profile is not None:
+		import cProfile
+		profiler = cProfile.Profile()
+		profiler.enable()
+
 	# Parse inputfile
 	try:
-		aGloriousJuggleFestScheduler.parse_input_file()
+		if (not aGloriousJuggleFestScheduler.load_cached() and 
+				not aGloriousJuggleFestScheduler.load_snapshot()):
+			aGloriousJuggleFestScheduler.parse_input_file()
+			if args.snapshot:
+				aGloriousJuggleFestScheduler.write_snapshot()
+		if args.resume:
+			aGloriousJuggleFestScheduler.resume()
 	except JuggleFestException:
 		root_logger.error(" A problem was encountered while processing inputfile.")
 	else:
-		# Start juggling
-		aGloriousJuggleFestScheduler.juggle()
-		# Output answer
-		aGloriousJuggleFestScheduler.output_answer()
+		try:
+			# Start juggling
+			aGloriousJuggleFestScheduler.juggle()
+			aGloriousJuggleFestScheduler.store_cached()
+			# Output answer
+			aGloriousJuggleFestScheduler.output_answer()
+			if args.circuit is not None:
+				print(aGloriousJuggleFestScheduler.circuit_juggler_sum(
+					args.circuit))
+			if args.verify:
+				blocking, over_capacity, unassigned = \
+					aGloriousJuggleFestScheduler.verify()
+				if blocking or over_capacity:
+					root_logger.error(" The schedule is not stable.")
+				print(("%d blocking pair(s), %d over-capacity circuit(s), "
+					"%d unassigned juggler(s)") % (len(blocking), 
+					len(over_capacity), len(unassigned)))
+		except JuggleFestException:
+			root_logger.error(" A problem was encountered while juggling.")
+
+	if args.profile is not None:
+		profiler.disable()
+		profiler.dump_stats(args.profile)
+	if args.stats:
+		print(aGloriousJuggleFestScheduler.stats)
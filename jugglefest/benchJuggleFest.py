@@ -0,0 +1,160 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+	import resource
+except ImportError:
+	resource = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODULE = os.path.join(HERE, "JuggleFest.py")
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+
+
+def load_module(path):
+	''' Import a JuggleFest.py from any path, so older versions can be
+			benchmarked side by side '''
+	name = "jugglefest_bench"
+	try:
+		from importlib.util import spec_from_file_location, module_from_spec
+	except ImportError:
+		import imp
+		return imp.load_source(name, path)
+	spec = spec_from_file_location(name, path)
+	module = module_from_spec(spec)
+	spec.loader.exec_module(module)
+	return module
+
+
+def peak_rss_kb():
+	''' Peak resident set size of this process in KiB, if known '''
+	# Unlike ru_maxrss, the high water mark starts over at exec
+	try:
+		with open("/proc/self/status") as f:
+			for line in f:
+				if line.startswith("VmHWM:"):
+					return int(line.split()[1])
+	except IOError:
+		pass
+	if resource is None:
+		return None
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# macOS reports bytes, Linux KiB
+	return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run_once(module_path, inputfile, options):
+	''' Time parse, match and output of one input in this process '''
+	module = load_module(module_path)
+	handle, outputfile = tempfile.mkstemp(suffix=".txt")
+	os.close(handle)
+	try:
+		scheduler = module.JuggleFestOmnipotentScheduler(inputfile,
+			output_file=outputfile, **options)
+		start = time.time()
+		scheduler.parse_input_file()
+		parsed = time.time()
+		scheduler.juggle()
+		matched = time.time()
+		scheduler.output_answer()
+		done = time.time()
+	finally:
+		os.remove(outputfile)
+	return {
+		"input": inputfile,
+		"circuits": len(scheduler.circuits),
+		"jugglers": len(scheduler.jugglers),
+		"parse_s": round(parsed - start, 4),
+		"match_s": round(matched - parsed, 4),
+		"output_s": round(done - matched, 4),
+		"total_s": round(done - start, 4),
+		"peak_rss_kb": peak_rss_kb(),
+		# Older versions do not count these
+		"proposals": getattr(scheduler, "proposals", None),
+		"rounds": getattr(scheduler, "rounds", None),
+	}
+
+
+def run_isolated(module_path, inputfile, options):
+	''' run_once() in a fresh interpreter so peak RSS is per input '''
+	output = subprocess.check_output([sys.executable, os.path.abspath(__file__),
+		"--run", inputfile, "-m", module_path, "--options", json.dumps(options)])
+	return json.loads(output.decode("utf-8").strip().splitlines()[-1])
+
+
+def sized_inputs(sizes, workdir, seed):
+	''' Generate (or reuse) one seeded instance per juggler count '''
+	from genJuggleFest import generate
+	if not os.path.isdir(workdir):
+		os.makedirs(workdir)
+	inputs = []
+	for size in sizes:
+		path = os.path.join(workdir, "jugglefest_%d_s%d.txt" % (size, seed))
+		if not os.path.exists(path):
+			sys.stderr.write("Generating %s\n" % path)
+			generate(path, size, seed=seed)
+		inputs.append(path)
+	return inputs
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(prog="JuggleFest Bench",
+		description="Time parse, match and output of JuggleFest.py on a set of inputs")
+	parser.add_argument("inputs", nargs="*", help="inputfiles to benchmark")
+	parser.add_argument("-m", "--module", default=DEFAULT_MODULE,
+		help="the JuggleFest.py to benchmark [default: the one next to this script]")
+	parser.add_argument("-n", "--sizes", type=int, nargs="+", default=None,
+		help="also benchmark generated instances with these juggler counts [default: %s when no inputs are given]"
+			% ' '.join(map(str, DEFAULT_SIZES)))
+	parser.add_argument("-s", "--seed", type=int, default=0,
+		help="seed for generated instances [default: %(default)s]")
+	parser.add_argument("-d", "--workdir", default=os.path.join(tempfile.gettempdir(), "jugglefest_bench"),
+		help="where generated instances are kept between runs [default: %(default)s]")
+	parser.add_argument("-r", "--repeat", type=int, default=1,
+		help="runs per input; the fastest total is kept [default: %(default)s]")
+	parser.add_argument("-o", "--output", default=None,
+		help="write the results to this JSON file [default: stdout]")
+	parser.add_argument("--options", default="{}",
+		help="JSON object of JuggleFestOmnipotentScheduler keyword arguments [default: none]")
+	parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)
+
+	args = parser.parse_args()
+	options = json.loads(args.options)
+
+	if args.run:
+		print(json.dumps(run_once(args.module, args.inputs[0], options)))
+		sys.exit(0)
+
+	inputs = list(args.inputs)
+	sizes = args.sizes if args.sizes or inputs else DEFAULT_SIZES
+	if sizes:
+		inputs += sized_inputs(sizes, args.workdir, args.seed)
+
+	results = []
+	for inputfile in inputs:
+		runs = [run_isolated(args.module, inputfile, options) for _ in range(args.repeat)]
+		best = min(runs, key=lambda run: run["total_s"])
+		sys.stderr.write("%s: parse %.3fs match %.3fs output %.3fs peak %s KiB\n" % (
+			os.path.basename(inputfile), best["parse_s"], best["match_s"],
+			best["output_s"], best["peak_rss_kb"]))
+		results.append(best)
+
+	report = json.dumps({
+		"module": os.path.abspath(args.module),
+		"version": getattr(load_module(args.module), "VERSION", None),
+		"python": platform.python_version(),
+		"platform": platform.platform(),
+		"options": options,
+		"results": results,
+	}, indent=2, sort_keys=True)
+	if args.output is None:
+		print(report)
+	else:
+		with open(args.output, 'w') as f:
+			f.write(report + '\n')
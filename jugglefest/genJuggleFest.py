@@ -0,0 +1,102 @@
+import argparse
+
+import numpy
+
+# Records formatted per write
+CHUNK_SIZE = 1 << 16
+# Random keys drawn at once for long preference lists
+SAMPLE_CELLS = 1 << 22
+DISTRIBUTIONS = ("uniform", "normal")
+
+
+def skills(rng, count, skill_max, distribution):
+	''' (count, 3) array of H, E and P values in [0, skill_max] '''
+	if distribution == "normal":
+		values = numpy.rint(rng.normal(skill_max / 2.0, skill_max / 6.0,
+			(count, 3)))
+		return numpy.clip(values, 0, skill_max).astype(numpy.int64)
+	return rng.randint(0, skill_max + 1, (count, 3))
+
+
+def preference_lists(rng, count, circuits, length):
+	''' (count, length) array of distinct circuit numbers per row '''
+	if length * length > circuits:
+		return sampled_lists(rng, count, circuits, length)
+	# Few collisions: redrawing the odd row with a repeat is cheapest
+	prefs = rng.randint(0, circuits, (count, length))
+	while True:
+		ordered = numpy.sort(prefs, axis=1)
+		repeats = numpy.flatnonzero((ordered[:, 1:] == ordered[:, :-1]).any(axis=1))
+		if not repeats.size:
+			return prefs
+		prefs[repeats] = rng.randint(0, circuits, (repeats.size, length))
+
+
+def sampled_lists(rng, count, circuits, length):
+	''' preference_lists() for lists that are a large share of circuits,
+			where whole rows rarely come out distinct: each row takes the
+			circuits with its length smallest random keys, in key order,
+			SAMPLE_CELLS keys at a time '''
+	prefs = numpy.empty((count, length), dtype=numpy.int64)
+	step = max(1, SAMPLE_CELLS // circuits)
+	for start in range(0, count, step):
+		stop = min(count, start + step)
+		keys = rng.random_sample((stop - start, circuits))
+		rows = numpy.arange(stop - start)[:, None]
+		top = numpy.argpartition(keys, length - 1, axis=1)[:, :length]
+		order = numpy.argsort(keys[rows, top], axis=1)
+		prefs[start:stop] = top[rows, order]
+	return prefs
+
+
+def write_records(f, template, columns):
+	''' Write one formatted record per row of columns '''
+	rows = columns.shape[0]
+	f.write((template * rows) % tuple(columns.ravel().tolist()))
+
+
+def generate(outfile, jugglers, circuits=None, preferences=10, skill_max=10,
+		distribution="uniform", seed=None):
+	''' Write a JuggleFest instance to outfile, CHUNK_SIZE records at a time.
+			The same seed always gives the same file. '''
+	circuits = max(1, jugglers // 6) if circuits is None else circuits
+	preferences = min(preferences, circuits)
+	rng = numpy.random.RandomState(seed)
+	with open(outfile, 'w') as f:
+		for start in range(0, circuits, CHUNK_SIZE):
+			count = min(CHUNK_SIZE, circuits - start)
+			columns = numpy.column_stack((numpy.arange(start, start + count),
+				skills(rng, count, skill_max, distribution)))
+			write_records(f, "C C%d H:%d E:%d P:%d\n", columns)
+		f.write('\n')
+		template = "J J%d H:%d E:%d P:%d" + (
+			' ' + ','.join(["C%d"] * preferences) if preferences else '') + '\n'
+		for start in range(0, jugglers, CHUNK_SIZE):
+			count = min(CHUNK_SIZE, jugglers - start)
+			columns = numpy.column_stack((numpy.arange(start, start + count),
+				skills(rng, count, skill_max, distribution),
+				preference_lists(rng, count, circuits, preferences)))
+			write_records(f, template, columns)
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(prog="JuggleFest Gen",
+		description="Generate JuggleFest instances for testing")
+	parser.add_argument("jugglers", type=int, help="create an instance with this many jugglers.")
+	parser.add_argument("outfile", help="filename to write the generated instance to")
+	parser.add_argument("-c", "--circuits", type=int, default=None,
+		help="number of circuits [default: jugglers / 6]")
+	parser.add_argument("-p", "--preferences", type=int, default=10,
+		help="circuits listed by each juggler; 0 leaves lists out [default: %(default)s]")
+	parser.add_argument("-m", "--skill-max", type=int, default=10, dest="skill_max",
+		help="highest H, E and P value [default: %(default)s]")
+	parser.add_argument("-d", "--distribution", choices=DISTRIBUTIONS, default="uniform",
+		help="how skill values are drawn [default: %(default)s]")
+	parser.add_argument("-s", "--seed", type=int, default=None,
+		help="random seed, for reproducible instances [default: unseeded]")
+
+	args = parser.parse_args()
+
+	generate(args.outfile, args.jugglers, circuits=args.circuits,
+		preferences=args.preferences, skill_max=args.skill_max,
+		distribution=args.distribution, seed=args.seed)
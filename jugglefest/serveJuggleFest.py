@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# -*- coding: utf_8 -*-
+
+"""
+A long-lived JuggleFest scheduling service. Parsed instances and their
+solved matchings are kept warm in memory, so questions about a festival do
+not re-parse its inputfile.
+
+The protocol is line-delimited JSON over TCP or a Unix socket. Every request
+is an object with an "op" (and optionally an "id", echoed in the reply):
+
+  {"op": "solve", "input": path, "options": {...}, "reload": false}
+  {"op": "query", "input": path, "juggler": number}
+  {"op": "query", "input": path, "circuit": number}
+  {"op": "whatif", "input": path, "changes": [...], "query": {...}}
+  {"op": "evict", "input": path}
+  {"op": "status"}
+
+Replies are {"id": ..., "ok": true, "result": ...} or {"id": ..., "ok": false,
+"error": message}. "options" are JuggleFestOmnipotentScheduler keyword
+arguments (eviction, backend, fallback); they are part of the instance key.
+What-if changes are applied to a copy of the warm matching, one object each:
+
+  {"op": "add_juggler", "juggler": n, "h": h, "e": e, "p": p, "preferences": [c, ...]}
+  {"op": "remove_juggler", "juggler": n}
+  {"op": "update_juggler", "juggler": n, "h": h, "e": e, "p": p, "preferences": [c, ...]}
+  {"op": "add_circuit", "circuit": n, "h": h, "e": e, "p": p}
+  {"op": "update_circuit", "circuit": n, "h": h, "e": e, "p": p}
+  {"op": "max_jugglers", "value": n}
+
+Roster size is one value for every circuit, so "max_jugglers" re-solves the
+copy from scratch before the other changes, which are repaired incrementally.
+
+Parses and full solves run in a process pool, so the pure-Python matching
+does not hold the service's GIL. Incremental what-ifs are cheap (copying the
+warm instance shares its rosters until they change) and run in a thread
+pool next to the event loop, which they hold up for as long as the repair
+takes.
+"""
+
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from JuggleFest import (JuggleFestOmnipotentScheduler, JuggleFestException,
+	init_logging, root_logger, roster_juggler)
+
+# Service defaults
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7345
+DEFAULT_MEMORY_BUDGET_MB = 1024
+DEFAULT_SOLVERS = 2
+# Scheduler options a request may set
+SOLVE_OPTIONS = ("eviction", "backend", "fallback", "preference_count")
+# Longest request line accepted
+MAX_LINE_BYTES = 1 << 20
+
+
+class ServiceError(JuggleFestException):
+	''' A request the service can not answer '''
+	pass
+
+
+class WarmInstance(object):
+
+	''' A solved scheduler kept in memory, with its size and last use '''
+
+	def __init__(self, scheduler, size):
+		self.scheduler = scheduler
+		self.size = size
+		self.last_used = time.time()
+
+
+class JuggleFestService(object):
+
+	''' Keeps solved instances warm and answers requests about them.
+
+	Parsing and full solves run in a process pool, incremental what-ifs in
+	a thread pool, so the event loop keeps serving queries meanwhile. 
+	Concurrent requests for an instance that is still loading wait on the 
+	same load. Warm instances never change after their solve; what-if 
+	changes are made to copies.
+	'''
+
+	def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET_MB << 20,
+			solvers=DEFAULT_SOLVERS, verbose=False, logging_file=None):
+		self.memory_budget = memory_budget
+		self.verbose = verbose
+		self.logging_file = logging_file
+		# Solved schedulers come back from the solver processes pickled
+		self.executor = ProcessPoolExecutor(max_workers=solvers)
+		self.repairs = ThreadPoolExecutor(max_workers=solvers)
+		# Key -> WarmInstance, least recently used first
+		self.warm = OrderedDict()
+		# Key -> future of a load in progress
+		self.loading = {}
+
+	@staticmethod
+	def key(request):
+		''' Instance key of a request: the inputfile and solve options '''
+		if "input" not in request:
+			raise ServiceError("Request needs an \"input\"")
+		options = request.get("options") or {}
+		unknown = set(options) - set(SOLVE_OPTIONS)
+		if unknown:
+			raise ServiceError("Unknown option(s) %s" % ', '.join(sorted(unknown)))
+		return (os.path.abspath(request["input"]),
+			tuple(sorted(options.items())))
+
+	async def run(self, function, *args):
+		''' Run a CPU-heavy call in the solver processes '''
+		loop = asyncio.get_running_loop()
+		return await loop.run_in_executor(self.executor, function, *args)
+
+	async def repair(self, function, *args):
+		''' Run an incremental update of a warm instance in a thread '''
+		loop = asyncio.get_running_loop()
+		return await loop.run_in_executor(self.repairs, function, *args)
+
+	async def instance(self, request, reload=False):
+		''' The warm scheduler for a request, loading and solving it first if
+				needed '''
+		key = self.key(request)
+		if key in self.warm and not reload:
+			entry = self.warm[key]
+			entry.last_used = time.time()
+			self.warm.move_to_end(key)
+			return entry.scheduler
+		if key not in self.loading:
+			self.loading[key] = asyncio.ensure_future(self._load(key))
+		try:
+			return await asyncio.shield(self.loading[key])
+		finally:
+			if key in self.loading and self.loading[key].done():
+				del self.loading[key]
+
+	async def _load(self, key):
+		''' [Private] Parse and solve an inputfile, then make room for it '''
+		path, options = key
+		scheduler, size = await self.run(solve, path, dict(options), 
+			self.verbose, self.logging_file)
+		self.warm.pop(key, None)
+		self.warm[key] = WarmInstance(scheduler, size)
+		root_logger.debug("Warmed %s (%d bytes)." % (path, size))
+		self.evict_to_budget(keep=key)
+		return scheduler
+
+	def evict_to_budget(self, keep=None):
+		''' Drop the least recently used instances until the warm set fits
+				the memory budget. The instance just loaded is kept even if it
+				alone is over budget. '''
+		total = sum([entry.size for entry in self.warm.values()])
+		for key in list(self.warm):
+			if total <= self.memory_budget:
+				break
+			if key == keep:
+				continue
+			entry = self.warm.pop(key)
+			total -= entry.size
+			root_logger.debug("Evicted %s, idle for %.1fs." %
+				(key[0], time.time() - entry.last_used))
+
+	async def handle(self, request):
+		''' Answer one request '''
+		op = request.get("op")
+		if op == "solve":
+			scheduler = await self.instance(request,
+				reload=bool(request.get("reload")))
+			return summarize(scheduler)
+		if op == "query":
+			return query(await self.instance(request), request)
+		if op == "whatif":
+			scheduler = await self.instance(request)
+			changes = request.get("changes") or []
+			if not isinstance(changes, list) or not all(
+					[isinstance(change, dict) for change in changes]):
+				raise ServiceError("What-if \"changes\" must be a list of objects")
+			# A new roster size means a full re-solve of the copy
+			if any([change.get("op") == "max_jugglers" for change in changes]):
+				return await self.run(what_if, scheduler, changes,
+					request.get("query"))
+			return await self.repair(what_if, scheduler, changes,
+				request.get("query"))
+		if op == "evict":
+			return self.warm.pop(self.key(request), None) is not None
+		if op == "status":
+			now = time.time()
+			return {
+				"memory_budget": self.memory_budget,
+				"instances": [{"input": key[0], "options": dict(key[1]),
+					"bytes": entry.size, "idle_s": round(now - entry.last_used, 3)}
+					for key, entry in self.warm.items()],
+				"loading": len(self.loading)}
+		raise ServiceError("Unknown op %r" % (op,))
+
+	async def serve_client(self, reader, writer):
+		''' Answer the requests on one connection. Each request runs as its
+				own task, so a slow solve does not hold up quick queries;
+				replies carry the request id. '''
+		tasks = set()
+		try:
+			while True:
+				line = await reader.readline()
+				if not line:
+					break
+				if line.strip():
+					task = asyncio.ensure_future(self.reply(line, writer))
+					tasks.add(task)
+					task.add_done_callback(tasks.discard)
+			if tasks:
+				await asyncio.wait(tasks)
+		except (ConnectionError, asyncio.LimitOverrunError, ValueError) as e:
+			root_logger.warning("Dropping client: %s" % e)
+		finally:
+			writer.close()
+
+	async def reply(self, line, writer):
+		''' Answer one request line and write the reply '''
+		request = {}
+		try:
+			request = json.loads(line.decode("utf-8"))
+			if not isinstance(request, dict):
+				raise ServiceError("Request must be a JSON object")
+			response = {"ok": True, "result": await self.handle(request)}
+		except JuggleFestException as e:
+			response = {"ok": False, "error": str(e) or e.__class__.__name__}
+		except (ValueError, KeyError, TypeError) as e:
+			response = {"ok": False, "error": "Bad request: %s" % e}
+		except Exception as e:
+			# Any other failure still gets a reply, or the client waits forever
+			root_logger.exception("Request failed: %r" % (request,))
+			response = {"ok": False, "error": "Internal error: %s" %
+				(str(e) or e.__class__.__name__)}
+		if isinstance(request, dict) and "id" in request:
+			response["id"] = request["id"]
+		writer.write((json.dumps(response) + '\n').encode("utf-8"))
+		await writer.drain()
+
+
+def solve(path, options, verbose=False, logging_file=None):
+	''' Parse and solve an inputfile; returns (scheduler, approximate bytes) '''
+	scheduler = JuggleFestOmnipotentScheduler(path, verbose=verbose,
+		logging_file=logging_file, **options)
+	if not scheduler.load_snapshot():
+		scheduler.parse_input_file()
+	scheduler.juggle()
+	return scheduler, scheduler.instance.memory_footprint()
+
+
+def summarize(scheduler):
+	''' Size and outcome of a solved instance '''
+	instance = scheduler.instance
+	return {
+		"circuits": instance.num_circuits,
+		"jugglers": instance.num_jugglers - len(instance.removed),
+		"assigned": sum([len(roster) for roster in instance.rosters]),
+		"max_jugglers": instance.max_jugglers,
+		"proposals": scheduler.proposals,
+	}
+
+
+def query(scheduler, request):
+	''' Where a juggler is placed (and which of its choices that is), or
+			who is on a circuit '''
+	instance = scheduler.instance
+	if "juggler" in request:
+		juggler = instance.juggler_index(int(request["juggler"]))
+		circuit = instance.assignment[juggler]
+		if circuit < 0:
+			return {"juggler": instance.juggler_nums[juggler], "circuit": None,
+				"choice": None, "fit": None}
+		position = instance.preference_position(juggler, circuit)
+		return {"juggler": instance.juggler_nums[juggler],
+			"circuit": instance.circuit_nums[circuit],
+			# 1 is the first choice; None if placed by the fallback phase
+			"choice": position + 1 if position >= 0 else None,
+			"fit": instance.fit(juggler, circuit)}
+	if "circuit" in request:
+		circuit = instance.circuit_index(int(request["circuit"]))
+		jugglers = [roster_juggler(key)
+			for key in sorted(instance.rosters[circuit], reverse=True)]
+		return {"circuit": instance.circuit_nums[circuit],
+			"jugglers": [instance.juggler_nums[j] for j in jugglers],
+			"sum": instance.juggler_sum(circuit)}
+	raise ServiceError("Query needs a \"juggler\" or a \"circuit\"")
+
+
+def what_if(scheduler, changes, question=None):
+	''' Apply changes to a copy of a solved scheduler; answers question
+			(a query request) on the copy, or summarizes it, along with how
+			many jugglers changed circuit '''
+	before = scheduler.instance
+	# A new roster size applies before any other change
+	changes = sorted(changes, key=lambda change: change.get("op") != "max_jugglers")
+	reset = any([change.get("op") == "max_jugglers" for change in changes])
+	trial = scheduler.copy(reset=reset)
+	if not reset:
+		# Only the jugglers the repair touches are compared
+		trial.instance.moves = {}
+	for change in changes:
+		apply_change(trial, change)
+	trial.juggle()
+	after = trial.instance
+	if reset:
+		# Every juggler was placed again by the re-solve
+		moved = sum([1 for j in range(before.num_jugglers)
+			if before.assignment[j] != after.assignment[j]])
+	else:
+		moved = after.moved(before.num_jugglers)
+	result = {"moved": moved}
+	result.update(query(trial, question) if question else summarize(trial))
+	return result
+
+
+def apply_change(scheduler, change):
+	''' Apply one what-if change to a scheduler '''
+	op = change.get("op")
+	skills = lambda: (int(change["h"]), int(change["e"]), int(change["p"]))
+	if op == "add_juggler":
+		scheduler.add_juggler(int(change["juggler"]), *skills(),
+			preferences=[int(c) for c in change["preferences"]])
+	elif op == "remove_juggler":
+		scheduler.remove_juggler(int(change["juggler"]))
+	elif op == "update_juggler":
+		scheduler.update_juggler(int(change["juggler"]), *skills(),
+			preferences=[int(c) for c in change["preferences"]])
+	elif op == "add_circuit":
+		scheduler.add_circuit(int(change["circuit"]), *skills())
+	elif op == "update_circuit":
+		scheduler.update_circuit(int(change["circuit"]), *skills())
+	elif op == "max_jugglers":
+		# Only valid on a reset copy; juggle() then solves from scratch
+		scheduler.instance.max_jugglers = int(change["value"])
+	else:
+		raise ServiceError("Unknown change %r" % (op,))
+
+
+async def main(args):
+	service = JuggleFestService(memory_budget=args.memory_budget << 20,
+		solvers=args.solvers, verbose=args.verbose, logging_file=args.logfile)
+	if args.unix is not None:
+		server = await asyncio.start_unix_server(service.serve_client,
+			path=args.unix, limit=MAX_LINE_BYTES)
+		where = args.unix
+	else:
+		server = await asyncio.start_server(service.serve_client,
+			host=args.host, port=args.port, limit=MAX_LINE_BYTES)
+		where = "%s:%d" % (args.host, args.port)
+	print("Serving JuggleFest on %s" % where)
+	sys.stdout.flush()
+	async with server:
+		await server.serve_forever()
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(prog="JuggleFest Service",
+		description="Serve JuggleFest solves, queries and what-ifs over line-delimited JSON")
+	parser.add_argument("--host", default=DEFAULT_HOST,
+		help="address to listen on [default: %(default)s]")
+	parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+		help="TCP port to listen on [default: %(default)s]")
+	parser.add_argument("--unix", default=None,
+		help="listen on this Unix socket path instead of TCP [default: no]")
+	parser.add_argument("-m", "--memory-budget", type=int, default=DEFAULT_MEMORY_BUDGET_MB,
+		dest="memory_budget", help="MiB of warm instances kept before the least recently used are evicted [default: %(default)s]")
+	parser.add_argument("-n", "--solvers", type=int, default=DEFAULT_SOLVERS,
+		help="processes running parses and solves, and threads running what-ifs [default: %(default)s]")
+	parser.add_argument("-v", "--verbose", action="store_true", default=False,
+		help="should I log my actions to console? [default: no]")
+	parser.add_argument("-l", "--log", nargs="?", const="jugglefest.log", default=None,
+		dest="logfile", help="should I log my actions to a logfile? [default: no]")
+
+	args = parser.parse_args()
+	init_logging(args.verbose, args.logfile)
+	try:
+		asyncio.run(main(args))
+	except KeyboardInterrupt:
+		pass
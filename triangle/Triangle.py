@@ -204,13 +204,45 @@ Time to code it.
 """
 
 # "Constants"
-VERSION = "0.1.4"
+VERSION = "0.2.1"
+BACKEND_PYTHON = "python"
+BACKEND_NUMPY = "numpy"
+BACKENDS = (BACKEND_PYTHON, BACKEND_NUMPY)
+INT64_MAX = (1 << 63) - 1
+# Bytes that separate values in an inputfile
+WHITESPACE = b" \t\n\r\x0b\x0c"
+# Row index sidecar: magic, rows, size and mtime of the inputfile, then 
+# rows + 1 little-endian uint64 byte offsets
+INDEX_SUFFIX = ".index"
+INDEX_MAGIC = b"TRIIDX01"
+INDEX_HEADER_FORMAT = "<8sQQd"
+# Bytes of the inputfile parsed at once by the out-of-core solver
+CHUNK_BYTES = 1 << 22
+# Binary triangles (genTriangle.py -b): magic, rows and a numpy dtype string,
+# then the values top-down as one flat little-endian array
+BINARY_MAGIC = b"TRIBIN01"
+BINARY_HEADER_FORMAT = "<8sQ8s"
+# Wavefront solver: rows per band, and tiles per worker in each phase
+WAVEFRONT_BAND = 256
+WAVEFRONT_TILES = 2
 
 # Python Standard Lib Imports
 import os
 import sys
 import argparse
 import logging
+import heapq
+import ctypes
+import multiprocessing
+import mmap
+import struct
+import tempfile
+
+# Optional Imports
+try:
+	import numpy
+except ImportError:
+	numpy = None
 
 # Attach root logger
 root_logger = logging.getLogger(__name__)
@@ -231,6 +263,148 @@ class FileParseFailure(TriangleException):
 	pass
 
 
+class BackendUnavailable(TriangleException):
+	''' The requested backend's dependencies are not installed '''
+	pass
+
+
+def row_offset(row):
+	''' Index of a row's first value in a flat top-down triangle '''
+	return row * (row + 1) // 2
+
+
+def value_starts(text):
+	''' (starts, space) masks over a uint8 array of an inputfile's bytes:
+			where a value starts, and which bytes are whitespace '''
+	spaces = numpy.zeros(256, dtype=bool)
+	spaces[numpy.frombuffer(WHITESPACE, dtype=numpy.uint8)] = True
+	space = spaces[text]
+	# A value starts wherever a non-space byte follows a space (or the start)
+	starts = ~space
+	starts[1:] &= space[:-1]
+	return starts, space
+
+
+def row_lengths(data):
+	''' Number of values on each non-blank line of an inputfile's bytes, 
+			counted without splitting it '''
+	text = numpy.frombuffer(data, dtype=numpy.uint8)
+	if not len(text):
+		return numpy.zeros(0, dtype=numpy.int64)
+	starts, space = value_starts(text)
+	# One count per line: a triangle has far fewer lines than values
+	bounds = [0] + (numpy.flatnonzero(text == ord('\n')) + 1).tolist()
+	counts = numpy.array([numpy.count_nonzero(starts[begin:end]) 
+		for begin, end in zip(bounds, bounds[1:] + [len(text)])])
+	return counts[counts > 0]
+
+
+def parse_rows(data, first=0):
+	''' Flat array of the values in data, which must hold whole rows of a
+			triangle starting at row first. Values out of int64 range come 
+			back as Python ints in an object array. Returns (values, rows). '''
+	counts = row_lengths(data)
+	rows = len(counts)
+	if not rows or (counts != numpy.arange(first + 1, first + rows + 1)).any():
+		root_logger.error("Row n of the inputfile must hold n + 1 values.")
+		raise FileParseFailure()
+	try:
+		# A known count spares fromstring growing its buffer as it goes
+		values = numpy.fromstring(data, dtype=numpy.int64, sep=' ', 
+			count=int(counts.sum()))
+		# fromstring saturates values out of range instead of failing
+		if magnitude(values) >= INT64_MAX:
+			values = numpy.array([int(value) for value in data.split()], 
+				dtype=object)
+	except ValueError:
+		root_logger.error("Non-integer value in inputfile.")
+		raise FileParseFailure()
+	return values, rows
+
+
+def row_value(data, index):
+	''' The index-th value on a line of an inputfile's bytes, parsed 
+			without parsing the others '''
+	text = numpy.frombuffer(data, dtype=numpy.uint8)
+	starts, space = value_starts(text)
+	starts = numpy.flatnonzero(starts)
+	if index >= len(starts):
+		root_logger.error("Row n of the inputfile must hold n + 1 values.")
+		raise FileParseFailure()
+	begin = int(starts[index])
+	ends = numpy.flatnonzero(space[begin:])
+	end = begin + int(ends[0]) if len(ends) else len(text)
+	try:
+		return int(data[begin:end])
+	except ValueError:
+		root_logger.error("Non-integer value in inputfile.")
+		raise FileParseFailure()
+
+
+def widen(values):
+	''' int64 copy of an integer array, or an object array of Python ints 
+			when its values do not fit '''
+	if magnitude(values) >= INT64_MAX:
+		return values.astype(object)
+	return values.astype(numpy.int64)
+
+
+def magnitude(values):
+	''' Largest absolute value in an int64 or object array '''
+	return max(abs(int(values.max())), abs(int(values.min())))
+
+
+def _init_wavefront(shared, count):
+	''' Attach a wavefront worker to the shared flat cost array '''
+	global _wavefront_costs
+	_wavefront_costs = numpy.frombuffer(shared, dtype=numpy.int64, count=count)
+
+
+def _wavefront_tile(task):
+	''' Percolate one tile of a band of rows, low (whose row below is done) 
+			up to high, in the shared cost array. A trapezoid tile covers 
+			columns [start, stop - depth) at depth rows above low, needing 
+			only itself; a gap tile covers the rest, [stop - depth, stop), 
+			once the trapezoids on both sides of it are done. '''
+	low, high, start, stop, gap = task
+	costs = _wavefront_costs
+	for row in range(low, high - 1, -1):
+		depth = low - row
+		first, last = (stop - depth, min(stop, row + 1)) if gap else (
+			start, stop - depth)
+		if first >= last:
+			continue
+		at, below = row_offset(row), row_offset(row + 1)
+		costs[at + first:at + last] += numpy.maximum(
+			costs[below + first:below + last], 
+			costs[below + first + 1:below + last + 1])
+
+
+def wavefront_tasks(low, high, workers, band):
+	''' Trapezoid and gap tiles of the band of rows low up to high: 
+			WAVEFRONT_TILES per worker, each at least band columns wide so 
+			its trapezoid never empties. The last tile reaches the end of 
+			every row, so it needs no gap. '''
+	width = low + 1
+	tile = max(band, -(-width // (workers * WAVEFRONT_TILES)))
+	bounds = list(range(0, width, tile)) + [width]
+	if len(bounds) > 2 and bounds[-1] - bounds[-2] < band:
+		del bounds[-2]
+	tiles = list(zip(bounds, bounds[1:]))
+	return ([(low, high, start, stop, False) for start, stop in tiles],
+		[(low, high, start, stop, True) for start, stop in tiles[:-1]])
+
+
+def index_path(input_file):
+	''' Where the row index of an inputfile lives '''
+	return input_file + INDEX_SUFFIX
+
+
+class NodeNotFound(TriangleException):
+	''' No node at the requested row and index '''
+	pass
+
+
 class TriangleNode(object):
 
 	''' A class representing a single node in a triangle data structure '''
@@ -293,6 +467,12 @@ class TriangleSolver(object):
 		self.verbose = verbose
 		self.logging_file = logging_file
 		self._rows = []
+		# Flat array of values (costs once solved) and its row count
+		self._flat = None
+		self._flat_rows = 0
+		# Whether self._flat holds percolated costs rather than values
+		self._flat_solved = False
+		self._binary_rows = 0
 
 		# Setup Logging Environment
 		if self.logging_file is not None:
@@ -315,48 +495,64 @@ class TriangleSolver(object):
 		root_logger.debug("Logging to File: %s. Verbose Logging to Console: %s."
 			% (self.logging_file is not None, self.verbose))
 
-	def parse_input_file(self):
-		''' Reads in triangle structure data and construct helper classes '''
+	def iter_rows(self):
+		''' Yields the rows of the inputfile top-down as lists of ints, 
+				checking that row n holds n + 1 values '''
+		binary = self.map_binary()
+		if binary is not None:
+			for row in range(self._binary_rows):
+				yield binary[row_offset(row):row_offset(row + 1)].tolist()
+			return
 		row = 0
 		try:
 			with open(self.input_file, "r") as f:
 				for line in f:
 					if len(line.strip()) == 0:  # Ignore blank lines
 						continue
-					row_nodes = []
-					for node in line.split():
-						row_nodes.append(TriangleNode(int(node), row=row, 
-							row_index=len(row_nodes)))
-					self._rows.append(row_nodes)
+					try:
+						values = [int(value) for value in line.split()]
+					except ValueError:
+						root_logger.error("Non-integer value in row %d." % row)
+						raise FileParseFailure()
+					if len(values) != row + 1:
+						root_logger.error("Row %d has %d values, expected %d." 
+							% (row, len(values), row + 1))
+						raise FileParseFailure()
+					yield values
 					row += 1
-
-				# Log rows loaded
-				root_logger.debug("%d rows loaded from inputfile." % len(self._rows))
-
-				# Assign Parents and Children
-				# TODO: this feels yucky. I should probably redo it.)
-				for row_idx, row in enumerate(self._rows):
-					for node_idx, node in enumerate(row):
-						try:
-							# Check if not leaf node	
-							if row_idx < len(self._rows) - 1:
-								# All of these nodes have both children
-								node.lchild = self._rows[row_idx + 1][node_idx]
-								node.rchild = self._rows[row_idx + 1][node_idx + 1]
-								# Check this is not a left most node
-							if node_idx > 0:
-								node.lparent = self._rows[row_idx - 1][node_idx - 1]
-							# Check this is not a right most node
-							if node_idx < row_idx:
-								node.rparent = self._rows[row_idx - 1][node_idx]
-							# Debug initializedn node:
-							root_logger.debug("Node Ready: %s" % node)
-						except IndexError:
-							root_logger.error("Error assigning parents/children.")
-							raise FileParseError()
 		except IOError:
 			root_logger.error("Error opening inputfile")
-			raise FileReadError()
+			raise FileReadFailure()
+		if row == 0:
+			root_logger.error("Inputfile holds no triangle.")
+			raise FileParseFailure()
+
+	def parse_input_file(self):
+		''' Reads in triangle structure data and construct helper classes '''
+		for row, values in enumerate(self.iter_rows()):
+			self._rows.append([TriangleNode(value, row=row, row_index=index)
+				for index, value in enumerate(values)])
+
+		# Log rows loaded
+		root_logger.debug("%d rows loaded from inputfile." % len(self._rows))
+
+		# Assign Parents and Children
+		# TODO: this feels yucky. I should probably redo it.)
+		for row_idx, row in enumerate(self._rows):
+			for node_idx, node in enumerate(row):
+				# Check if not leaf node	
+				if row_idx < len(self._rows) - 1:
+					# All of these nodes have both children
+					node.lchild = self._rows[row_idx + 1][node_idx]
+					node.rchild = self._rows[row_idx + 1][node_idx + 1]
+					# Check this is not a left most node
+				if node_idx > 0:
+					node.lparent = self._rows[row_idx - 1][node_idx - 1]
+				# Check this is not a right most node
+				if node_idx < row_idx:
+					node.rparent = self._rows[row_idx - 1][node_idx]
+				# Debug initializedn node:
+				root_logger.debug("Node Ready: %s" % node)
 
 	def _init_file_logging(self):
 		''' [Private] Initializes file-based logging if requested at 
@@ -382,12 +578,15 @@ class TriangleSolver(object):
 		''' Runs through the triangle in reverse percolating weights to parent
 				nodes '''
 
-		# Iterate through rows in reverse, ignore the leaf nodes
+		# Iterate through rows in reverse. A leaf weighs its own value.
 		# Computer weighted value
 		root_logger.debug("Percolating Weights...")
+		for node in self._rows[-1]:
+			node.weighted_cost = node.value
 		for row in self._rows[:-1][::-1]:
 			for node in row:
-				node.weighted_cost = node.value + max(node.children(), key=lambda n: n.value).value
+				node.weighted_cost = node.value + max(node.children(), 
+					key=lambda n: n.weighted_cost).weighted_cost
 
 		# Traverse the triangle
 		current_node = self._rows[0][0]
@@ -402,21 +601,525 @@ class TriangleSolver(object):
 		total += current_node.value
 		node_order.append(current_node)
 
-		# Pretty print answer
-		root_logger.debug("Final Path Found: " +  
-			' -> '.join([str(node.value) for node in node_order]))
+		values = [node.value for node in node_order]
+		self.report(total, values)
+		return total, values
+
+	def stream_weights(self, track_path=True):
+		''' Solves the triangle top-down in one pass over the inputfile, 
+				keeping only the previous row's best partial sums: O(width) 
+				memory for the total. 
+
+		With track_path, one bit per node records which parent a node's 
+		best partial sum came from (about rows^2 / 16 bytes, held as one 
+		int per row), and a second pass over the inputfile collects the 
+		values on the path. Ties go to the left parent and the leftmost 
+		leaf, which picks the same path as percolate_weights() does going
+		left on ties from the top.
+		'''
+		root_logger.debug("Streaming Weights...")
+		edge = float("-inf")
+		best = []
+		choices = []
+		for values in self.iter_rows():
+			if not best:
+				best = values
+				choices.append(0)
+				continue
+			# Parents of node j are j - 1 (left) and j (right) a row up
+			padded = [edge] + best + [edge]
+			pairs = list(zip(padded, padded[1:]))
+			if track_path:
+				# Bit j is set when node j continues from its right parent
+				choices.append(int(''.join(['1' if right > left else '0' 
+					for left, right in pairs])[::-1], 2))
+			best = [max(pair) + value for pair, value in zip(pairs, values)]
+		total = max(best)
+		root_logger.debug("%d rows streamed from inputfile." % len(best))
+		if not track_path:
+			self.report(total)
+			return total, None
+
+		# Walk the choice bits back up from the leftmost best leaf
+		index = best.index(total)
+		indexes = [index]
+		for bits in choices[:0:-1]:
+			if not (bits >> index) & 1:
+				index -= 1
+			indexes.append(index)
+		indexes.reverse()
+		values = [row[index] for row, index in zip(self.iter_rows(), indexes)]
+		self.report(total, values)
+		return total, values
+
+	def load_flat(self):
+		''' Reads the inputfile into one flat int64 array (self._flat), row n
+				starting at row_offset(n). When values, or totals along a 
+				path, could overflow int64, Python ints are kept in an object 
+				array instead. Returns the number of rows. 
+
+		A binary inputfile is memory-mapped and copied to int64 as it is, 
+		with no parsing.
+		'''
+		if numpy is None:
+			root_logger.error("The numpy backend requires numpy to be installed.")
+			raise BackendUnavailable()
+		binary = self.map_binary()
+		if binary is not None:
+			values, rows = widen(binary), self._binary_rows
+		else:
+			try:
+				with open(self.input_file, "rb") as f:
+					data = f.read()
+			except IOError:
+				root_logger.error("Error opening inputfile")
+				raise FileReadFailure()
+			values, rows = parse_rows(data)
+		if values.dtype != object and magnitude(values) * rows > INT64_MAX:
+			root_logger.debug("Totals may overflow int64, using Python ints.")
+			values = values.astype(object)
+		self._flat, self._flat_rows = values, rows
+		self._flat_solved = False
+		root_logger.debug("%d rows loaded from inputfile." % rows)
+		return rows
+
+	def vectorized_weights(self):
+		''' percolate_weights() over the flat array from load_flat(): each row
+				in turn, bottom-up, gains the larger of each adjacent pair in 
+				the row below, in place. The path is an argmax walk from the 
+				top (left on ties, as in percolate_weights()); the values 
+				along it are recovered by subtracting the chosen child's 
+				cost. '''
+		self._percolate_flat()
+		total, values = self.best_path()
+		self.report(total, values)
+		return total, values
+
+	def _percolate_flat(self):
+		''' [Private] Percolate the flat array in place, bottom-up '''
+		costs, rows = self._flat, self._flat_rows
+		root_logger.debug("Percolating Weights...")
+		for row in range(rows - 2, -1, -1):
+			start, below = row_offset(row), row_offset(row + 1)
+			costs[start:below] += numpy.maximum(costs[below:below + row + 1],
+				costs[below + 1:below + row + 2])
+		self._flat_solved = True
+
+	def parallel_weights(self, workers=None, band=WAVEFRONT_BAND):
+		''' vectorized_weights() across a pool of worker processes, over a 
+				flat cost array they share. Bands of rows are percolated 
+				bottom-up as a wavefront in two phases: every tile's 
+				trapezoid concurrently, then the gaps between them (see 
+				_wavefront_tile()). Same total and path as 
+				percolate_weights(). Needs load_flat() first; object arrays 
+				(values past int64) are solved serially. '''
+		workers = workers or multiprocessing.cpu_count()
+		rows = self._flat_rows
+		if workers < 2 or self._flat.dtype == object:
+			return self.vectorized_weights()
+		count = len(self._flat)
+		shared = multiprocessing.RawArray(ctypes.c_int64, count)
+		costs = numpy.frombuffer(shared, dtype=numpy.int64, count=count)
+		costs[:] = self._flat
+		self._flat = costs
+		root_logger.debug("Percolating Weights in %d processes..." % workers)
+		pool = multiprocessing.Pool(workers, initializer=_init_wavefront,
+			initargs=(shared, count))
+		try:
+			for low in range(rows - 2, -1, -band):
+				high = max(0, low - band + 1)
+				for phase in wavefront_tasks(low, high, workers, band):
+					pool.map(_wavefront_tile, phase, chunksize=1)
+		finally:
+			pool.terminate()
+			pool.join()
+		self._flat_solved = True
+		total, values = self.best_path()
+		self.report(total, values)
+		return total, values
+
+	def top_k_paths(self, k):
+		''' The k best distinct top-to-bottom paths, best first, as a list 
+				of (total, values). The first is the path percolate_weights()
+				finds.
+
+		Every path is the best path with a few deviations: a node taking 
+		its worse child, for a loss of the difference between the 
+		children's costs. Paths are found best-first, each as its parent 
+		path plus one deviation on the greedy stretch below the parent's 
+		last deviation. Popping a path pushes only two candidates, its 
+		cheapest deviation and its parent's next cheapest, so the search 
+		heap holds at most 2k entries. Each found path keeps a heap of the
+		deviations below its own: O(rows^2 + k * rows) after percolating.
+		'''
+		costs, rows = self._flat, self._flat_rows
+		if not self._flat_solved:
+			costs, rows = self._percolated()
+		cost = costs.item if numpy is not None else costs.__getitem__
+
+		def descend(row, index):
+			''' Values on the greedy path (left on ties) from (row, index) 
+					to the bottom, and a heap of (loss, row, index) for taking
+					the worse child at each node on it '''
+			values, losses = [], []
+			start = row_offset(row)
+			for row in range(row, rows - 1):
+				below = start + row + 1
+				left, right = cost(below + index), cost(below + index + 1)
+				values.append(cost(start + index) - max(left, right))
+				losses.append((abs(left - right), row, index))
+				if right > left:
+					index += 1
+				start = below
+			values.append(cost(start + index))
+			heapq.heapify(losses)
+			return values, losses
+
+		# A path is (total, values, heap of deviations below its last one)
+		paths = [(cost(0),) + descend(0, 0)]
+		candidates = []
+
+		def push(path):
+			''' Queue a path's cheapest remaining deviation '''
+			if path[2]:
+				deviation = heapq.heappop(path[2])
+				heapq.heappush(candidates, (deviation[0] - path[0], 
+					len(candidates) + len(paths), path, deviation))
+
+		push(paths[0])
+		while len(paths) < k and candidates:
+			total, _, parent, (loss, row, index) = heapq.heappop(candidates)
+			# The parent's next cheapest deviation
+			push(parent)
+			# The worse child, then greedy to the bottom
+			below = row_offset(row + 1) + index
+			child = index if cost(below + 1) > cost(below) else index + 1
+			values, losses = descend(row + 1, child)
+			path = (-total, parent[1][:row + 1] + values, losses)
+			push(path)
+			paths.append(path)
+		root_logger.debug("Found %d best paths." % len(paths))
+		return [(path[0], path[1]) for path in paths]
+
+	def _percolated(self):
+		''' [Private] Flat costs, each node's best total down to the bottom,
+				and the row count; percolated with numpy when installed '''
+		if numpy is not None:
+			self.load_flat()
+			self._percolate_flat()
+			return self._flat, self._flat_rows
+		costs = []
+		rows = 0
+		for values in self.iter_rows():
+			costs.extend(values)
+			rows += 1
+		for row in range(rows - 2, -1, -1):
+			start, below = row_offset(row), row_offset(row + 1)
+			for index in range(row + 1):
+				costs[start + index] += max(costs[below + index], 
+					costs[below + index + 1])
+		self._flat, self._flat_rows = costs, rows
+		self._flat_solved = True
+		return costs, rows
+
+	def best_path(self):
+		''' (total, values) of the best path, by an argmax walk down the 
+				percolated flat cost array (left on ties): O(rows). The 
+				values along it are recovered by subtracting the chosen 
+				child's cost. '''
+		costs, rows = self._flat, self._flat_rows
+		if not self._flat_solved:
+			costs, rows = self._percolated()
+		root_logger.debug("Traversing Triangle...")
+		total = int(costs[0])
+		values = []
+		current = index = 0
+		for row in range(1, rows):
+			below = row_offset(row) + index
+			if costs[below + 1] > costs[below]:
+				index += 1
+			chosen = row_offset(row) + index
+			values.append(int(costs[current] - costs[chosen]))
+			current = chosen
+		values.append(int(costs[current]))
+		return total, values
+
+	def update(self, row, index, value):
+		''' Set the value at (row, index), re-percolating only what that 
+				changes in the resident cost array (see _percolated()). 
+				Returns the new total; best_path() follows in O(rows).
+
+		Only the cone above the node can change, and it widens by a node per
+		row going up. Each of its rows is recomputed from the old and new 
+		costs of the row below (a node's value is its old cost less its 
+		old better child's), then narrowed to the nodes whose cost changed.
+		It stops at the first row where none did.
+		'''
+		costs, rows = self._flat, self._flat_rows
+		if not self._flat_solved:
+			costs, rows = self._percolated()
+		if not (0 <= row < rows and 0 <= index <= row):
+			root_logger.error("No node at row %d, index %d." % (row, index))
+			raise NodeNotFound()
+		at, below = row_offset(row) + index, row_offset(row + 1) + index
+		old = int(costs[at])
+		delta = value - (old - (int(max(costs[below], costs[below + 1])) 
+			if row < rows - 1 else 0))
+		if not delta:
+			return int(costs[0])
+		listed = isinstance(costs, list)
+		if (not listed and costs.dtype != object and 
+				magnitude(costs) + abs(delta) > INT64_MAX):
+			root_logger.debug("Totals may overflow int64, using Python ints.")
+			self._flat = costs = costs.astype(object)
+		costs[at] = old + delta
+
+		# Old costs of the nodes [low, high) of the row below that changed
+		low, high, changed = index, index + 1, [old]
+		for row in range(row - 1, -1, -1):
+			start, below = row_offset(row), row_offset(row + 1)
+			first, last = max(low - 1, 0), min(high, row + 1)
+			new_below = costs[below + first:below + last + 1]
+			if listed:
+				old_below = new_below[:]
+			else:
+				old_below = new_below.copy()
+			old_below[low - first:high - first] = changed
+			old_costs = costs[start + first:start + last]
+			if listed:
+				new_costs = [cost - max(left, right) + max(new_left, new_right)
+					for cost, left, right, new_left, new_right in zip(old_costs, 
+					old_below, old_below[1:], new_below, new_below[1:])]
+				moved = [node for node, (new, cost) in enumerate(zip(new_costs, 
+					old_costs)) if new != cost]
+			else:
+				new_costs = (old_costs - numpy.maximum(old_below[:-1], 
+					old_below[1:]) + numpy.maximum(new_below[:-1], new_below[1:]))
+				moved = numpy.flatnonzero(new_costs != old_costs)
+			if not len(moved):
+				break
+			low, high = int(moved[0]), int(moved[-1]) + 1
+			changed = old_costs[low:high]
+			if not listed:
+				changed = changed.copy()
+			costs[start + first + low:start + first + high] = new_costs[low:high]
+			low, high = first + low, first + high
+		return int(costs[0])
+
+	def map_binary(self):
+		''' Zero-copy view of the values of a binary inputfile (see 
+				BINARY_HEADER_FORMAT), memory-mapped, or None when the 
+				inputfile is text. Sets self._binary_rows. '''
+		header = struct.calcsize(BINARY_HEADER_FORMAT)
+		try:
+			with open(self.input_file, "rb") as f:
+				start = f.read(header)
+				if not start.startswith(BINARY_MAGIC):
+					return None
+				if numpy is None:
+					root_logger.error("Binary triangles require numpy to be "
+						"installed.")
+					raise BackendUnavailable()
+				mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		except (IOError, OSError, ValueError):
+			root_logger.error("Error opening inputfile")
+			raise FileReadFailure()
+		try:
+			magic, rows, dtype = struct.unpack(BINARY_HEADER_FORMAT, start)
+			dtype = numpy.dtype(dtype.rstrip(b"\0").decode("ascii"))
+		except (struct.error, TypeError, ValueError, UnicodeDecodeError):
+			dtype = None
+		if (dtype is None or dtype.kind not in "iu" or not rows or 
+				len(mapped) != header + row_offset(rows) * dtype.itemsize):
+			root_logger.error("Malformed binary triangle header.")
+			raise FileParseFailure()
+		self._binary_rows = rows
+		return numpy.frombuffer(mapped, dtype=dtype, count=row_offset(rows),
+			offset=header)
+
+	def _row_reader(self):
+		''' [Private] (rows, end offsets of the rows, read(start, stop), 
+				value(row, index), mapped inputfile or None) for reading rows
+				[start, stop) by chunk, or a single value: straight from a 
+				binary inputfile, or through the row index of a text one '''
+		binary = self.map_binary()
+		if binary is not None:
+			rows = self._binary_rows
+			offsets = numpy.array([row_offset(row) for row in range(rows + 1)],
+				dtype=numpy.int64) * binary.itemsize
+			return rows, offsets, lambda start, stop: widen(
+				binary[row_offset(start):row_offset(stop)]), lambda row, index: (
+				int(binary[row_offset(row) + index])), None
+		offsets = self.load_index()
+		if offsets is None:
+			offsets = self.build_index()
+		try:
+			with open(self.input_file, "rb") as f:
+				mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		except (IOError, OSError, ValueError):
+			root_logger.error("Error opening inputfile")
+			raise FileReadFailure()
+		return len(offsets) - 1, offsets, lambda start, stop: parse_rows(
+			mapped[int(offsets[start]):int(offsets[stop])], start)[0], (
+			lambda row, index: row_value(
+			mapped[int(offsets[row]):int(offsets[row + 1])], index)), mapped
+
+	def build_index(self):
+		''' One pass over the inputfile recording the byte offset of every 
+				row, and the end of the file, in a sidecar next to it (see 
+				index_path()). Returns the offsets. '''
+		if numpy is None:
+			root_logger.error("The row index requires numpy to be installed.")
+			raise BackendUnavailable()
+		offsets = []
+		position = 0
+		try:
+			with open(self.input_file, "rb") as f:
+				for line in f:
+					if line.strip():
+						offsets.append(position)
+					position += len(line)
+			source = os.stat(self.input_file)
+		except (IOError, OSError):
+			root_logger.error("Error opening inputfile")
+			raise FileReadFailure()
+		if not offsets:
+			root_logger.error("Inputfile holds no triangle.")
+			raise FileParseFailure()
+		offsets.append(position)
+		offsets = numpy.array(offsets, dtype="<u8")
+
+		# Written to a temporary name and renamed into place
+		path = index_path(self.input_file)
+		temp_path = "%s.%d.tmp" % (path, os.getpid())
+		try:
+			with open(temp_path, "wb") as f:
+				f.write(struct.pack(INDEX_HEADER_FORMAT, INDEX_MAGIC, 
+					len(offsets) - 1, source.st_size, source.st_mtime))
+				f.write(offsets.tobytes())
+			getattr(os, "replace", os.rename)(temp_path, path)
+			root_logger.debug("Wrote row index of inputfile to %s." % path)
+		except (IOError, OSError):
+			root_logger.warning("Could not write row index %s." % path)
+		return offsets
+
+	def load_index(self):
+		''' Row offsets from the sidecar index, or None when it is missing
+				or was taken from an older inputfile '''
+		path = index_path(self.input_file)
+		header = struct.calcsize(INDEX_HEADER_FORMAT)
+		try:
+			source = os.stat(self.input_file)
+			with open(path, "rb") as f:
+				magic, rows, size, mtime = struct.unpack(INDEX_HEADER_FORMAT, 
+					f.read(header))
+				offsets = numpy.frombuffer(f.read(), dtype="<u8")
+		except (IOError, OSError, struct.error):
+			return None
+		if (magic != INDEX_MAGIC or len(offsets) != rows + 1 or 
+				size != source.st_size or mtime != source.st_mtime):
+			root_logger.debug("Row index %s is stale." % path)
+			return None
+		root_logger.debug("Loaded row index from %s." % path)
+		return offsets
+
+	def out_of_core_weights(self, track_path=True, scratch_dir=None):
+		''' percolate_weights() for triangles larger than memory. Rows are 
+				read bottom-up through the row index (built if missing or 
+				stale), CHUNK_BYTES of the memory-mapped inputfile at a time,
+				and only the DP row is kept. Binary inputfiles need no index.
+
+		With track_path, each row's choices (one bit per node, set when the 
+		right child is larger) go to a temporary file in scratch_dir. A 
+		forward pass then follows them from the top, parsing just the one 
+		value on the path from each row. Ties go left, as in 
+		percolate_weights().
+		'''
+		rows, offsets, read_rows, read_value, mapped = self._row_reader()
+		root_logger.debug("Percolating Weights...")
+		bits = tempfile.TemporaryFile(dir=scratch_dir) if track_path else None
+		try:
+			costs = None
+			stop = rows
+			while stop > 0:
+				# Rows [start, stop) span at most CHUNK_BYTES, or one row
+				start = min(stop - 1, int(numpy.searchsorted(offsets, 
+					int(offsets[stop]) - CHUNK_BYTES)))
+				values = read_rows(start, stop)
+				if costs is not None and values.dtype != costs.dtype:
+					costs, values = costs.astype(object), values.astype(object)
+				elif (values.dtype != object and magnitude(values) * (stop - 
+						start) + (0 if costs is None else magnitude(costs)) 
+						> INT64_MAX):
+					root_logger.debug("Totals may overflow int64, using Python "
+						"ints.")
+					values = values.astype(object)
+					if costs is not None:
+						costs = costs.astype(object)
+				base = row_offset(start)
+				for row in range(stop - 1, start - 1, -1):
+					row_values = values[row_offset(row) - base:
+						row_offset(row + 1) - base]
+					if costs is None:
+						costs = row_values.copy()
+						continue
+					left, right = costs[:-1], costs[1:]
+					if bits is not None:
+						bits.write(numpy.packbits(right > left).tobytes())
+					costs = numpy.maximum(left, right) + row_values
+				stop = start
+			total = int(costs[0])
+			if bits is None:
+				self.report(total)
+				return total, None
+
+			# Rows' bits were written bottom-up, so row 0's are last
+			root_logger.debug("Traversing Triangle...")
+			bits.seek(0, os.SEEK_END)
+			position = bits.tell()
+			bits.seek(0)
+			choices = bits.read() if position < CHUNK_BYTES else mmap.mmap(
+				bits.fileno(), 0, access=mmap.ACCESS_READ)
+			index = 0
+			values = []
+			for row in range(rows):
+				values.append(read_value(row, index))
+				if row < rows - 1:
+					position -= (row + 8) // 8
+					byte = bytearray(choices[position + index // 8:
+						position + index // 8 + 1])[0]
+					if byte & (0x80 >> (index % 8)):
+						index += 1
+		finally:
+			if mapped is not None:
+				mapped.close()
+			if bits is not None:
+				bits.close()
+		self.report(total, values)
+		return total, values
+
+	def report(self, total, values=None):
+		''' Logs the answer, and prints it when not verbose '''
+		if values is not None:
+			root_logger.debug("Final Path Found: " +  
+				' -> '.join([str(value) for value in values]))
 		root_logger.debug("Total: %d" % total)
 		
 		# Print something simple when not verbose
 		if not self.verbose:
-			print ' -> '.join([str(node.value) for node in node_order]),
-			print '=', total
+			if values is None:
+				print(total)
+			else:
+				print(' -> '.join([str(value) for value in values]) + 
+					' = %d' % total)
 
 
 if __name__ == '__main__':
 
 	def usage_override(name=None):
-		return """%(prog)s [-h] [-v] [-l [logfile]] inputfile\n
+		return """%(prog)s [-h] [-v] [-l [logfile]] [-s | -o] [-t]
+           [-b {{python,numpy}}] [-w workers] [-k K]
+           [-u row index value] inputfile\n
  _______   _                   _       _____       _                
 |__   __| (_)                 | |     / ____|     | |               
    | |_ __ _  __ _ _ __   __ _| | ___| (___   ___ | |_   _____ _ __ 
@@ -452,6 +1155,68 @@ if __name__ == '__main__':
 		dest="logfile",
 		metavar="logfile",
 		help="should I log my actions to a logfile? [default: no]")
+	parser.add_argument(
+		"-s",
+		"--stream",
+		action="store_true",
+		default=False,
+		dest="stream",
+		help=("should I stream the inputfile top-down in O(width) memory "
+			"instead of building the whole triangle? [default: no]"))
+	parser.add_argument(
+		"-o",
+		"--out-of-core",
+		action="store_true",
+		default=False,
+		dest="out_of_core",
+		help=("should I solve bottom-up through a row index, a chunk of the "
+			"inputfile at a time, for triangles larger than memory? "
+			"[default: no]"))
+	parser.add_argument(
+		"-t",
+		"--total-only",
+		action="store_false",
+		default=True,
+		dest="track_path",
+		help=("with -s or -o, should I skip the path and report only the "
+			"total? [default: no]"))
+	parser.add_argument(
+		"-b",
+		"--backend",
+		choices=BACKENDS,
+		default=BACKEND_PYTHON,
+		dest="backend",
+		help=("without -s, should I solve with a node per value (python) or "
+			"one flat array (numpy)? [default: %(default)s]"))
+	parser.add_argument(
+		"-w",
+		"--workers",
+		type=int,
+		default=1,
+		dest="workers",
+		metavar="workers",
+		help=("with -b numpy, how many processes should share the solve as a "
+			"wavefront of tiles? [default: %(default)s]"))
+	parser.add_argument(
+		"-k",
+		"--top",
+		type=int,
+		default=1,
+		dest="top",
+		metavar="K",
+		help=("how many of the best paths should I report, best first? "
+			"[default: %(default)s]"))
+	parser.add_argument(
+		"-u",
+		"--update",
+		nargs=3,
+		type=int,
+		action="append",
+		default=[],
+		dest="updates",
+		metavar=("row", "index", "value"),
+		help=("should I change a value after solving, re-solving just what "
+			"it affects? May be repeated. [default: no]"))
 	parser.add_argument(
 		"inputfile",
 		help="""a path to a file containing a triangle data structure to be
@@ -464,7 +1229,31 @@ if __name__ == '__main__':
 		verbose=args.verbose,
 		logging_file=args.logfile)
 
-	# Parse Input
-	aTriangleSolver.parse_input_file()
-	# Solve
-	aTriangleSolver.percolate_weights()
+	if args.updates:
+		# Solve, apply each update incrementally, and report the best path
+		for row, index, value in args.updates:
+			aTriangleSolver.update(row, index, value)
+		aTriangleSolver.report(*aTriangleSolver.best_path())
+	elif args.top > 1:
+		# Parse, Solve and report the K best paths
+		for total, values in aTriangleSolver.top_k_paths(args.top):
+			aTriangleSolver.report(total, values)
+	elif args.stream:
+		# Parse and Solve in one pass
+		aTriangleSolver.stream_weights(track_path=args.track_path)
+	elif args.out_of_core:
+		# Solve a chunk at a time through the row index
+		aTriangleSolver.out_of_core_weights(track_path=args.track_path)
+	elif args.backend == BACKEND_NUMPY:
+		# Parse Input into one flat array
+		aTriangleSolver.load_flat()
+		# Solve
+		if args.workers > 1:
+			aTriangleSolver.parallel_weights(workers=args.workers)
+		else:
+			aTriangleSolver.vectorized_weights()
+	else:
+		# Parse Input
+		aTriangleSolver.parse_input_file()
+		# Solve
+		aTriangleSolver.percolate_weights()
@@ -0,0 +1,246 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+	import resource
+except ImportError:
+	resource = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODULE = os.path.join(HERE, "Triangle.py")
+DEFAULT_SIZES = (10000,)
+# graph: a TriangleNode per value, stream: top-down rolling row, numpy: flat
+# array, parallel: flat array percolated as a wavefront by a process pool,
+# update: point updates re-solved incrementally on a resident numpy solve
+MODES = ("graph", "stream", "numpy", "parallel", "update")
+DEFAULT_UPDATES = 100
+# The node graph needs hundreds of bytes per value, so it is skipped above this
+DEFAULT_GRAPH_ROWS = 2000
+
+
+def load_module(path):
+	''' Import a Triangle.py from any path, so older versions can be
+			benchmarked side by side '''
+	name = "triangle_bench"
+	try:
+		from importlib.util import spec_from_file_location, module_from_spec
+	except ImportError:
+		import imp
+		return imp.load_source(name, path)
+	spec = spec_from_file_location(name, path)
+	module = module_from_spec(spec)
+	# Registered so that worker processes can unpickle its functions
+	sys.modules[name] = module
+	spec.loader.exec_module(module)
+	return module
+
+
+def peak_rss_kb():
+	''' Peak resident set size of this process in KiB, if known '''
+	# Unlike ru_maxrss, the high water mark starts over at exec
+	try:
+		with open("/proc/self/status") as f:
+			for line in f:
+				if line.startswith("VmHWM:"):
+					return int(line.split()[1])
+	except IOError:
+		pass
+	if resource is None:
+		return None
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# macOS reports bytes, Linux KiB
+	return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def count_rows(inputfile):
+	''' Rows of a binary or text inputfile '''
+	from genTriangle import BINARY_MAGIC, BINARY_HEADER_FORMAT
+	with open(inputfile, 'rb') as f:
+		header = f.read(struct.calcsize(BINARY_HEADER_FORMAT))
+		if header.startswith(BINARY_MAGIC):
+			return struct.unpack(BINARY_HEADER_FORMAT, header)[1]
+		f.seek(0)
+		return sum(1 for line in f if line.strip())
+
+
+def run_once(module_path, inputfile, mode, workers=1, updates=DEFAULT_UPDATES, seed=0):
+	''' Time parse and solve of one input in this process; the answer goes
+			to stdout ahead of the timings '''
+	module = load_module(module_path)
+	# Keep per-node debug records from being formatted at all
+	module.root_logger.disabled = True
+	solver = module.TriangleSolver(inputfile)
+	start = time.time()
+	if mode == "stream":
+		parsed = start
+		total = solver.stream_weights()[0]
+		solved = time.time()
+	else:
+		if mode in ("numpy", "parallel", "update"):
+			solver.load_flat()
+		else:
+			solver.parse_input_file()
+		parsed = time.time()
+		if mode in ("numpy", "update"):
+			total = solver.vectorized_weights()[0]
+		elif mode == "parallel":
+			total = solver.parallel_weights(workers=workers)[0]
+		else:
+			total = solver.percolate_weights()[0]
+		solved = time.time()
+	result = {}
+	if mode == "update":
+		result.update(time_updates(solver, updates, seed))
+		# A full re-solve is the parse and solve above
+		result["speedup_vs_resolve"] = round((solved - start) / max(result["update_mean_s"], 1e-9), 1)
+	result.update({
+		"input": inputfile,
+		"mode": mode,
+		"workers": workers if mode == "parallel" else 1,
+		# Streaming parses and solves in one pass, reported as solve time
+		"parse_s": round(parsed - start, 4),
+		"solve_s": round(solved - parsed, 4),
+		"total_s": round(solved - start, 4),
+		"peak_rss_kb": peak_rss_kb(),
+		"total": total,
+	})
+	return result
+
+
+def time_updates(solver, updates, seed):
+	''' Latency of update() followed by best_path() for seeded random
+			point updates on a solved triangle '''
+	rows = solver._flat_rows
+	rng = random.Random(seed)
+	latencies = []
+	for _ in range(updates):
+		row = rng.randrange(rows)
+		index = rng.randrange(row + 1)
+		value = rng.randint(1, 100)
+		start = time.time()
+		solver.update(row, index, value)
+		solver.best_path()
+		latencies.append(time.time() - start)
+	latencies.sort()
+	return {
+		"updates": updates,
+		"update_mean_s": round(sum(latencies) / len(latencies), 6),
+		"update_p50_s": round(latencies[len(latencies) // 2], 6),
+		"update_max_s": round(latencies[-1], 6),
+	}
+
+
+def run_isolated(module_path, inputfile, mode, workers=1, updates=DEFAULT_UPDATES, seed=0):
+	''' run_once() in a fresh interpreter so peak RSS is per input and mode '''
+	output = subprocess.check_output([sys.executable, os.path.abspath(__file__),
+		"--run", inputfile, "-m", module_path, "--modes", mode, "-w", str(workers),
+		"-u", str(updates), "-s", str(seed)])
+	return json.loads(output.decode("utf-8").strip().splitlines()[-1])
+
+
+def sized_inputs(sizes, workdir, seed, binary=False):
+	''' Generate (or reuse) one seeded triangle per row count '''
+	from genTriangle import generate
+	if not os.path.isdir(workdir):
+		os.makedirs(workdir)
+	inputs = []
+	for size in sizes:
+		path = os.path.join(workdir, "triangle_%d_s%d.%s" % (size, seed,
+			"bin" if binary else "txt"))
+		if not os.path.exists(path):
+			sys.stderr.write("Generating %s\n" % path)
+			generate(path, size, seed=seed, binary=binary)
+		inputs.append(path)
+	return inputs
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(prog="Triangle Bench",
+		description="Time parse and solve of Triangle.py's solvers on a set of inputs")
+	parser.add_argument("inputs", nargs="*", help="inputfiles to benchmark")
+	parser.add_argument("-m", "--module", default=DEFAULT_MODULE,
+		help="the Triangle.py to benchmark [default: the one next to this script]")
+	parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES),
+		help="solvers to compare [default: all]")
+	parser.add_argument("-n", "--sizes", type=int, nargs="+", default=None,
+		help="also benchmark generated triangles with these row counts [default: %s when no inputs are given]"
+			% ' '.join(map(str, DEFAULT_SIZES)))
+	parser.add_argument("-g", "--graph-rows", type=int, default=DEFAULT_GRAPH_ROWS,
+		help="skip the graph solver on triangles with more rows [default: %(default)s]")
+	parser.add_argument("-w", "--workers", type=int, nargs="+", default=[1, 2, 4, 8],
+		help="process counts for the parallel solver's speedup curve [default: %(default)s]")
+	parser.add_argument("-u", "--updates", type=int, default=DEFAULT_UPDATES,
+		help="random point updates timed by the update mode [default: %(default)s]")
+	parser.add_argument("-s", "--seed", type=int, default=0,
+		help="seed for generated triangles and updates [default: %(default)s]")
+	parser.add_argument("-b", "--binary", action="store_true", default=False,
+		help="generate triangles in the binary format instead of text [default: no]")
+	parser.add_argument("-d", "--workdir", default=os.path.join(tempfile.gettempdir(), "triangle_bench"),
+		help="where generated triangles are kept between runs [default: %(default)s]")
+	parser.add_argument("-r", "--repeat", type=int, default=1,
+		help="runs per input and solver; the fastest total is kept [default: %(default)s]")
+	parser.add_argument("-o", "--output", default=None,
+		help="write the results to this JSON file [default: stdout]")
+	parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)
+
+	args = parser.parse_args()
+
+	if args.run:
+		print(json.dumps(run_once(args.module, args.inputs[0], args.modes[0],
+			args.workers[0], args.updates, args.seed)))
+		sys.exit(0)
+
+	inputs = list(args.inputs)
+	sizes = args.sizes if args.sizes or inputs else DEFAULT_SIZES
+	if sizes:
+		inputs += sized_inputs(sizes, args.workdir, args.seed, args.binary)
+
+	results = []
+	for inputfile in inputs:
+		rows = count_rows(inputfile)
+		for mode in args.modes:
+			if mode == "graph" and rows > args.graph_rows:
+				sys.stderr.write("%s: graph skipped, %d rows\n" % (
+					os.path.basename(inputfile), rows))
+				continue
+			baseline = None
+			for workers in (args.workers if mode == "parallel" else [1]):
+				runs = [run_isolated(args.module, inputfile, mode, workers, args.updates, args.seed)
+					for _ in range(args.repeat)]
+				best = min(runs, key=lambda run: run["total_s"])
+				best["rows"] = rows
+				if mode == "parallel":
+					# Solve time relative to the first worker count given
+					baseline = baseline or best["solve_s"]
+					best["speedup"] = round(baseline / max(best["solve_s"], 1e-9), 3)
+				sys.stderr.write("%s %s x%d: parse %.3fs solve %.3fs peak %s KiB\n" % (
+					os.path.basename(inputfile), mode, best["workers"], best["parse_s"],
+					best["solve_s"], best["peak_rss_kb"]))
+				if mode == "update":
+					sys.stderr.write("%s update: mean %.6fs p50 %.6fs max %.6fs, %.0fx a re-solve\n" % (
+						os.path.basename(inputfile), best["update_mean_s"], best["update_p50_s"],
+						best["update_max_s"], best["speedup_vs_resolve"]))
+				results.append(best)
+
+	report = json.dumps({
+		"module": os.path.abspath(args.module),
+		"version": getattr(load_module(args.module), "VERSION", None),
+		"python": platform.python_version(),
+		"platform": platform.platform(),
+		"cpus": multiprocessing.cpu_count(),
+		"results": results,
+	}, indent=2, sort_keys=True)
+	if args.output is None:
+		print(report)
+	else:
+		with open(args.output, 'w') as f:
+			f.write(report + '\n')
@@ -1,18 +1,87 @@
 import argparse
-import random
+import struct
 
-# Seed
-random.seed()
+import numpy
 
-parser = argparse.ArgumentParser(prog="Triangle Gen", description="Generate triangles for testing")
-parser.add_argument("rows", type=int, help="create a triangle with this many rows.")
-parser.add_argument("outfile", help="filename to write output of generated triangle to")
+# Values generated and formatted per write
+CHUNK_VALUES = 1 << 20
+# Binary triangles, as memory-mapped by Triangle.py: magic, rows and a numpy
+# dtype string, then the values top-down as one flat little-endian array
+BINARY_MAGIC = b"TRIBIN01"
+BINARY_HEADER_FORMAT = "<8sQ8s"
+DTYPES = ("int8", "int16", "int32", "int64")
 
-args = parser.parse_args()
 
-# open file for writing
-with open(args.outfile, 'w+') as f:
-	for row in range(args.rows + 1):
-		for node in range(row):
-			f.write(str(random.randint(1, 100)) + ' ')
-		f.write('\n') 
\ No newline at end of file
+def holds(name, low, high):
+	''' Whether the integer dtype name holds every value in [low, high] '''
+	info = numpy.iinfo(name)
+	return info.min <= low and high <= info.max
+
+
+def value_dtype(low, high, name=None):
+	''' Smallest signed little-endian dtype holding every value in [low, high],
+			or the named one if it holds them all '''
+	if name is not None:
+		if not holds(name, low, high):
+			raise ValueError("values in [%d, %d] do not fit in %s" % (low, high, name))
+		return numpy.dtype(name).newbyteorder('<')
+	for name in DTYPES:
+		if holds(name, low, high):
+			return numpy.dtype(name).newbyteorder('<')
+	raise ValueError("values in [%d, %d] do not fit in int64" % (low, high))
+
+
+def row_chunks(rows):
+	''' (start, stop) ranges of rows holding about CHUNK_VALUES values each '''
+	start = 0
+	while start < rows:
+		stop = start + 1
+		while stop < rows and (stop + 1) * (stop + 2) // 2 - start * (start + 1) // 2 <= CHUNK_VALUES:
+			stop += 1
+		yield start, stop
+		start = stop
+
+
+def generate(outfile, rows, low=1, high=100, seed=None, binary=False, dtype=None):
+	''' Write a triangle of rows rows of values in [low, high] to outfile,
+			CHUNK_VALUES at a time. The same seed always gives the same
+			values, as text or binary. '''
+	dtype = value_dtype(low, high, dtype)
+	rng = numpy.random.RandomState(seed)
+	with open(outfile, 'wb' if binary else 'w') as f:
+		if binary:
+			f.write(struct.pack(BINARY_HEADER_FORMAT, BINARY_MAGIC, rows,
+				dtype.str.encode("ascii")))
+		for start, stop in row_chunks(rows):
+			count = stop * (stop + 1) // 2 - start * (start + 1) // 2
+			values = rng.randint(low, high + 1, count, dtype=numpy.int64)
+			if binary:
+				f.write(values.astype(dtype).tobytes())
+			else:
+				template = ''.join(["%d " * (row + 1) + '\n' for row in range(start, stop)])
+				f.write(template % tuple(values.tolist()))
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(prog="Triangle Gen", description="Generate triangles for testing")
+	parser.add_argument("rows", type=int, help="create a triangle with this many rows.")
+	parser.add_argument("outfile", help="filename to write output of generated triangle to")
+	parser.add_argument("-s", "--seed", type=int, default=None,
+		help="random seed, for reproducible triangles [default: unseeded]")
+	parser.add_argument("--min", type=int, default=1, dest="low",
+		help="lowest value [default: %(default)s]")
+	parser.add_argument("-m", "--max", type=int, default=100, dest="high",
+		help="highest value [default: %(default)s]")
+	parser.add_argument("-b", "--binary", action="store_true", default=False,
+		help="write the binary format Triangle.py memory-maps instead of text [default: no]")
+	parser.add_argument("-d", "--dtype", choices=DTYPES, default=None,
+		help="binary value type [default: the smallest that holds --min and --max]")
+
+	args = parser.parse_args()
+	try:
+		value_dtype(args.low, args.high, args.dtype)
+	except ValueError as e:
+		parser.error(str(e))
+
+	generate(args.outfile, args.rows, low=args.low, high=args.high, seed=args.seed,
+		binary=args.binary, dtype=args.dtype)